@@ -0,0 +1,348 @@
+﻿import os
+import hmac
+import json
+import secrets
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from YoutubePullerEngine import APP_DATA_DIR, FINISHED, Job, gui_print, is_inside, normalize_and_validate_input
+from YoutubePullerFormats import TARGETS, parse_output
+
+# ================================================================
+#  API DEFAULTS
+# ================================================================
+# Loopback only, and every request needs the token from TOKEN_PATH:
+# other local users and web pages open in a browser can't read it
+DEFAULT_API_HOST = "127.0.0.1"
+DEFAULT_API_PORT = 8765
+TOKEN_PATH = os.path.join(APP_DATA_DIR, "api-token")
+TOKEN_HEADER = "X-YoutubePuller-Token"
+
+# Host headers a request may carry; anything else is DNS rebinding
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+
+# GET /jobs pages through the job list this many at a time
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Per-job settings a client may override on POST /jobs, with their JSON type
+JOB_OVERRIDES = {
+    "output_folder": str,
+    "output_format": str,
+    "skip_existing": bool,
+    "stream": bool,
+    "connections": int,
+    "interactive": bool,
+    "extra_outputs": list,
+}
+
+TYPE_NAMES = {str: "a string", bool: "true or false", int: "a whole number", list: "a list"}
+
+
+def api_token(path=TOKEN_PATH):
+    """
+    The API token, made on first use and readable by this user only.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            token = f.read().strip()
+        if token:
+            return token
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    token = secrets.token_urlsafe(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token)
+    return token
+
+
+def host_name(header):
+    # "127.0.0.1:8765" → "127.0.0.1", "[::1]:8765" → "::1"
+    if header.startswith("["):
+        return header[1:].split("]")[0]
+    return header.rsplit(":", 1)[0]
+
+
+def check_overrides(body, output_root):
+    """
+    The job settings a POST /jobs body overrides, checked before any
+    job is made. Raises ValueError naming the first bad one.
+    """
+    overrides = {}
+    for name, kind in JOB_OVERRIDES.items():
+        if name not in body:
+            continue
+
+        value = body[name]
+        # JSON true / false are ints to Python, but no count
+        if not isinstance(value, kind) or (kind is int and isinstance(value, bool)):
+            raise ValueError(f"'{name}' must be {TYPE_NAMES[kind]}")
+        overrides[name] = value
+
+    if "output_folder" in overrides and not (output_root and is_inside(overrides["output_folder"], output_root)):
+        raise ValueError(f"'output_folder' must be inside {output_root}")
+    if overrides.get("output_format", "mp3") not in TARGETS:
+        raise ValueError(f"Unknown output format: {overrides['output_format']} "
+                         f"(one of {', '.join(sorted(TARGETS))})")
+    if overrides.get("connections", 1) < 1:
+        raise ValueError("'connections' must be at least 1")
+    for spec in overrides.get("extra_outputs", ()):
+        if not isinstance(spec, str):
+            raise ValueError("'extra_outputs' must be a list of strings")
+        parse_output(spec)
+
+    return overrides
+
+
+# ================================================================
+#  REQUEST HANDLER
+# ================================================================
+class ApiHandler(BaseHTTPRequestHandler):
+    """
+    POST   /jobs              {"urls": [...], "output_format": "opus",
+                               "extra_outputs": ["mp3:320k"], …}
+    GET    /jobs              ?status=running&offset=0&limit=100
+    GET    /jobs/<id>         one job with its progress
+    DELETE /jobs/<id>         cancel (POST /jobs/<id>/cancel works too)
+
+    Every request needs the token (TOKEN_HEADER) and a loopback Host;
+    POST bodies must be application/json. A custom header and a JSON
+    body both make browsers ask first (CORS preflight), which this
+    server never grants, so web pages can't drive it.
+
+    Every request is answered from memory on its own thread; nothing
+    waits on a download.
+    """
+
+    server_version = "YoutubePuller"
+
+    def log_message(self, format, *args):
+        pass   # the engine log is noisy enough
+
+    # --- plumbing ---
+    def _send(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode("utf-8"))
+
+    def _allowed(self):
+        """
+        Checks Host and token; answers the request itself if they fail.
+        """
+        if host_name(self.headers.get("Host") or "") not in LOOPBACK_HOSTS:
+            self._send(403, {"error": "Host not allowed"})
+            return False
+
+        token = self.headers.get(TOKEN_HEADER) or ""
+        if not hmac.compare_digest(token.encode("utf-8"), self.server.token.encode("utf-8")):
+            self._send(401, {"error": f"Missing or wrong {TOKEN_HEADER} (see {TOKEN_PATH})"})
+            return False
+        return True
+
+    def _route(self):
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        return parts, parse_qs(url.query)
+
+    def _job_or_404(self, raw_id):
+        job = self.server.job_queue.get(int(raw_id)) if raw_id.isdigit() else None
+        if job is None:
+            self._send(404, {"error": f"No job {raw_id}"})
+        return job
+
+    # --- verbs ---
+    def do_GET(self):
+        if not self._allowed():
+            return
+        parts, query = self._route()
+
+        if parts == ["jobs"]:
+            self._list_jobs(query)
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = self._job_or_404(parts[1])
+            if job:
+                self._send(200, job.describe())
+        else:
+            self._send(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if not self._allowed():
+            return
+        parts, _ = self._route()
+
+        if parts == ["jobs"]:
+            self._submit()
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "cancel":
+            self._cancel(parts[1])
+        else:
+            self._send(404, {"error": f"Unknown path {self.path}"})
+
+    def do_DELETE(self):
+        if not self._allowed():
+            return
+        parts, _ = self._route()
+
+        if len(parts) == 2 and parts[0] == "jobs":
+            self._cancel(parts[1])
+        else:
+            self._send(404, {"error": f"Unknown path {self.path}"})
+
+    # --- endpoints ---
+    def _submit(self):
+        content_type = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+        if content_type != "application/json":
+            self._send(415, {"error": "Content-Type must be application/json"})
+            return
+
+        try:
+            body = self._read_json()
+        except (ValueError, UnicodeDecodeError):
+            self._send(400, {"error": "Body must be JSON"})
+            return
+
+        if not isinstance(body, dict):
+            self._send(400, {"error": "Body must be a JSON object"})
+            return
+
+        urls = body.get("urls") or ([body["url"]] if body.get("url") else [])
+        if not urls or not isinstance(urls, list):
+            self._send(400, {"error": "Give 'url' or 'urls' (a list)"})
+            return
+
+        job_options = dict(self.server.job_defaults)
+        try:
+            job_options.update(check_overrides(body, job_options["output_folder"]))
+        except ValueError as e:
+            self._send(400, {"error": str(e)})
+            return
+
+        queued, playlists, folders, invalid = [], [], [], []
+        for raw_input in urls:
+            url_or_file, input_type = normalize_and_validate_input(str(raw_input))
+
+            if not url_or_file:
+                invalid.append(raw_input)
+            elif input_type == "playlist":
+                self.server.job_queue.submit_playlist(url_or_file, **job_options)
+                playlists.append(url_or_file)
+            elif input_type == "folder":
+                self.server.job_queue.submit_folder(url_or_file, **job_options)
+                folders.append(url_or_file)
+            else:
+                job = self.server.job_queue.submit(Job(url_or_file, **job_options))
+                queued.append(job.describe())
+
+        if queued or playlists or folders:
+            gui_print(f"🌐 API queued {len(queued)} job(s), {len(playlists)} playlist(s), "
+                      f"{len(folders)} folder(s)")
+
+        self._send(202 if queued or playlists or folders else 400, {
+            "jobs": queued,
+            "playlists": playlists,
+            "folders": folders,
+            "invalid": invalid,
+        })
+
+    def _list_jobs(self, query):
+        status = query.get("status", [None])[0]
+        try:
+            offset = max(0, int(query.get("offset", [0])[0]))
+            limit = min(MAX_PAGE_SIZE, max(1, int(query.get("limit", [DEFAULT_PAGE_SIZE])[0])))
+        except ValueError:
+            self._send(400, {"error": "offset and limit must be numbers"})
+            return
+
+        job_queue = self.server.job_queue
+        jobs = job_queue.snapshot()
+
+        if status:
+            jobs = [job for job in jobs if job.status == status]
+
+        self._send(200, {
+            "total": len(jobs),
+            "counts": job_queue.counts(),
+            "jobs": [job.describe() for job in jobs[offset:offset + limit]],
+        })
+
+    def _cancel(self, raw_id):
+        job = self._job_or_404(raw_id)
+        if job is None:
+            return
+
+        if job.status in FINISHED:
+            self._send(409, dict(job.describe(), error=f"Job already {job.status}"))
+            return
+
+        self.server.job_queue.cancel(job.id)
+        job.log("⏹ Cancel requested over the API")
+        self._send(202, job.describe())
+
+
+# ================================================================
+#  SERVER
+# ================================================================
+def serve_api(job_queue, job_defaults, host=DEFAULT_API_HOST, port=DEFAULT_API_PORT):
+    """
+    Starts the job API on a background thread and returns the server
+    (server.server_address has the real port when `port` is 0).
+    `job_defaults` are the Job() settings used unless a request
+    overrides them.
+    """
+    server = ThreadingHTTPServer((host, port), ApiHandler)
+    server.daemon_threads = True
+    server.job_queue = job_queue
+    server.job_defaults = dict(job_defaults)
+    server.token = api_token()
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    gui_print(f"🌐 Job API listening on http://{host}:{server.server_address[1]}")
+    return server
+
+
+# ================================================================
+#  CLIENT (for other local tools)
+# ================================================================
+class ApiClient:
+    def __init__(self, base_url=f"http://{DEFAULT_API_HOST}:{DEFAULT_API_PORT}", token=None):
+        self.base_url = base_url.rstrip("/")
+        self.token = token or api_token()
+
+    def _call(self, method, path, payload=None):
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(
+            self.base_url + path, data=data, method=method,
+            headers={"Content-Type": "application/json", TOKEN_HEADER: self.token},
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                return json.loads(response.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            return json.loads(e.read().decode("utf-8"))
+
+    def submit(self, urls, **job_options):
+        return self._call("POST", "/jobs", dict(job_options, urls=list(urls)))
+
+    def jobs(self, status=None, offset=0, limit=DEFAULT_PAGE_SIZE):
+        query = f"?offset={offset}&limit={limit}" + (f"&status={status}" if status else "")
+        return self._call("GET", "/jobs" + query)
+
+    def job(self, job_id):
+        return self._call("GET", f"/jobs/{job_id}")
+
+    def cancel(self, job_id):
+        return self._call("DELETE", f"/jobs/{job_id}")
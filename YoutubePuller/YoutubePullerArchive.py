@@ -0,0 +1,59 @@
+﻿import os
+import threading
+
+
+# ================================================================
+#  DOWNLOAD ARCHIVE
+# ================================================================
+class DownloadArchive:
+    """
+    Remembers which (video ID, output format, encode parameters) were
+    already produced and where the output went.
+
+    Backed by an append-only tab-separated file that is loaded into a
+    dict once, so lookups and additions stay O(1) no matter how many
+    hundreds of thousands of entries the archive holds.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._load()
+
+    @staticmethod
+    def key(video_id, output_format, encode_params):
+        return (video_id, output_format, encode_params)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) != 4:
+                    continue   # torn write from a crash → ignore the line
+
+                video_id, output_format, encode_params, output_file = parts
+                self.entries[self.key(video_id, output_format, encode_params)] = output_file
+
+    def lookup(self, video_id, output_format, encode_params):
+        """
+        Returns the recorded output file if it still exists, else None.
+        """
+        output_file = self.entries.get(self.key(video_id, output_format, encode_params))
+
+        if output_file and os.path.exists(output_file):
+            return output_file
+        return None
+
+    def add(self, video_id, output_format, encode_params, output_file):
+        line = "\t".join((video_id, output_format, encode_params, output_file)) + "\n"
+
+        with self.lock:
+            self.entries[self.key(video_id, output_format, encode_params)] = output_file
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
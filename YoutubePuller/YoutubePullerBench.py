@@ -0,0 +1,356 @@
+﻿import os
+import re
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ================================================================
+#  BENCH DEFAULTS
+# ================================================================
+# Everything the bench writes (media, outputs, journal, archive,
+# metadata cache, temp files) stays under here, away from the user's
+# ~/.youtubepuller and the GUI's temp dirs. Must be set before the
+# engine is imported: it picks its paths at import time.
+BENCH_DIR = os.path.join(tempfile.gettempdir(), "youtubepuller-bench")
+os.environ["HOME"] = os.environ["USERPROFILE"] = os.path.join(BENCH_DIR, "home")
+tempfile.tempdir = os.path.join(BENCH_DIR, "tmp")
+os.makedirs(tempfile.tempdir, exist_ok=True)
+
+import yt_dlp
+from yt_dlp.extractor.common import InfoExtractor
+
+from YoutubePullerEngine import Job, JobQueue, events, set_encoders, set_transcode_cache
+from YoutubePullerEvents import LogLine
+from YoutubePullerFormats import TARGETS
+from YoutubePullerMetrics import STAGE_NAMES, StageMetrics
+from YoutubePullerYdlPool import register_extractor
+
+DEFAULT_CONCURRENCY = (1, 2, 4)
+DEFAULT_JOBS = 8            # jobs per concurrency level
+DEFAULT_SOURCES = 4         # distinct synthetic tracks the jobs cycle through
+DEFAULT_DURATION = 180      # seconds of audio per track
+
+# Source formats the stand-in site offers, mirroring YouTube's audio-only ones:
+# format_id → (ext, acodec, abr, ffmpeg encoder args). Like YouTube's, the
+# m4a has its index up front, so it can be decoded from a pipe.
+SOURCE_FORMATS = {
+    "251": ("webm", "opus", 160, ["-c:a", "libopus", "-b:a", "160k"]),
+    "140": ("m4a", "mp4a.40.2", 128, ["-c:a", "aac", "-b:a", "128k", "-movflags", "+faststart"]),
+}
+SAMPLE_RATE = 48000
+
+
+# ================================================================
+#  SYNTHETIC MEDIA (ffmpeg lavfi sources)
+# ================================================================
+def make_media(ffmpeg_path, folder, sources=DEFAULT_SOURCES, duration=DEFAULT_DURATION):
+    """
+    Renders `sources` tracks (a tone over pink noise, so the encoders
+    have real work to do) in every SOURCE_FORMATS format. Files from
+    an earlier run with the same duration are reused.
+    """
+    os.makedirs(folder, exist_ok=True)
+
+    for n in range(sources):
+        for format_id, (ext, _, _, codec_args) in SOURCE_FORMATS.items():
+            path = os.path.join(folder, f"track{n}-{duration}s.{format_id}.{ext}")
+            if os.path.exists(path):
+                continue
+
+            print(f"🎼 Rendering {os.path.basename(path)}", file=sys.stderr)
+            subprocess.run([
+                ffmpeg_path, "-y", "-hide_banner", "-loglevel", "error",
+                "-f", "lavfi", "-i", f"sine=frequency={220 + 110 * n}:sample_rate={SAMPLE_RATE}:duration={duration}",
+                "-f", "lavfi", "-i", f"anoisesrc=color=pink:amplitude=0.1:sample_rate={SAMPLE_RATE}:duration={duration}",
+                "-filter_complex", "amix=inputs=2", "-ac", "2",
+                *codec_args, path + ".tmp." + ext,
+            ], check=True)
+            os.replace(path + ".tmp." + ext, path)
+
+
+# ================================================================
+#  LOCAL MEDIA SERVER
+# ================================================================
+class MediaHandler(BaseHTTPRequestHandler):
+    """
+    GET /api/<video id>      metadata the stand-in extractor reads
+    GET /media/<file>        a track, with Range support (206)
+
+    Video IDs end in "-<n>"; job n plays track n % sources.
+    """
+
+    protocol_version = "HTTP/1.1"   # keep-alive, like a real CDN
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type, headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+            self.server.count_bytes(len(body))
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        parts = [p for p in self.path.split("?")[0].split("/") if p]
+
+        if len(parts) == 2 and parts[0] == "api":
+            self._info(parts[1])
+        elif len(parts) == 2 and parts[0] == "media":
+            self._media(parts[1])
+        else:
+            self._send(404, b"not found", "text/plain")
+
+    def _info(self, video_id):
+        n = int(video_id.rsplit("-", 1)[-1]) % self.server.sources
+        base = f"http://{self.headers.get('Host')}"
+
+        formats = []
+        for format_id, (ext, acodec, abr, _) in SOURCE_FORMATS.items():
+            name = f"track{n}-{self.server.duration}s.{format_id}.{ext}"
+            formats.append({
+                "format_id": format_id,
+                "url": f"{base}/media/{name}",
+                "ext": ext,
+                "acodec": acodec,
+                "vcodec": "none",
+                "abr": abr,
+                "asr": SAMPLE_RATE,
+                "filesize": os.path.getsize(os.path.join(self.server.media_folder, name)),
+            })
+
+        body = json.dumps({
+            "id": video_id,
+            "title": f"bench {video_id}",
+            "duration": self.server.duration,
+            "formats": formats,
+        }).encode("utf-8")
+        self._send(200, body, "application/json")
+
+    def _media(self, name):
+        path = os.path.join(self.server.media_folder, os.path.basename(name))
+        if not os.path.isfile(path):
+            self._send(404, b"not found", "text/plain")
+            return
+
+        size = os.path.getsize(path)
+        content_type = "audio/webm" if path.endswith(".webm") else "audio/mp4"
+
+        m = re.match(r"bytes=(\d+)-(\d*)$", self.headers.get("Range") or "")
+        start, end = (int(m.group(1)), int(m.group(2) or size - 1)) if m else (0, size - 1)
+        end = min(end, size - 1)
+
+        if start >= size:
+            self._send(416, b"", content_type, [("Content-Range", f"bytes */{size}")])
+            return
+
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read(end - start + 1)
+
+        if not m:
+            self._send(200, data, content_type, [("Accept-Ranges", "bytes")])
+            return
+
+        self._send(206, data, content_type, [
+            ("Accept-Ranges", "bytes"),
+            ("Content-Range", f"bytes {start}-{end}/{size}"),
+        ])
+
+
+class MediaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, media_folder, sources, duration, port=0):
+        super().__init__(("127.0.0.1", port), MediaHandler)
+        self.media_folder = media_folder
+        self.sources = sources
+        self.duration = duration
+        self.lock = threading.Lock()
+        self.bytes_sent = 0
+
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def count_bytes(self, n):
+        with self.lock:
+            self.bytes_sent += n
+
+
+# ================================================================
+#  STAND-IN EXTRACTOR
+# ================================================================
+class BenchIE(InfoExtractor):
+    """
+    Plays the part of the YouTube extractor for the local media server:
+    one metadata round-trip, then a YouTube-like audio format list.
+    """
+
+    IE_NAME = "youtubepuller:bench"
+    _VALID_URL = r"http://127\.0\.0\.1:\d+/watch\?v=(?P<id>[\w-]+)"
+
+    def _real_extract(self, url):
+        video_id = self._match_id(url)
+        base = url.split("/watch")[0]
+        return self._download_json(f"{base}/api/{video_id}", video_id)
+
+
+register_extractor(BenchIE)
+
+
+# ================================================================
+#  BENCHMARK RUN
+# ================================================================
+def run_level(job_queue, server, concurrency, jobs, job_options):
+    """
+    Runs `jobs` jobs with `concurrency` workers in every stage and
+    returns the throughput and per-stage latency of the batch.
+    """
+    for stage in job_queue.stages:
+        job_queue.set_workers(concurrency, stage)
+
+    output_folder = os.path.join(BENCH_DIR, "out", f"c{concurrency}")
+    shutil.rmtree(output_folder, ignore_errors=True)
+
+    sent_before = server.bytes_sent
+    started = time.perf_counter()
+
+    batch = [
+        job_queue.submit(Job(
+            f"{server.base_url}/watch?v=c{concurrency}-{n}",
+            output_folder=output_folder, skip_existing=False, **job_options,
+        ))
+        for n in range(jobs)
+    ]
+    job_queue.join()
+
+    wall = time.perf_counter() - started
+    megabytes = (server.bytes_sent - sent_before) / 1048576
+
+    metrics = StageMetrics()
+    for job in batch:
+        metrics.record(job.status, job.timings.stages)
+    snapshot = metrics.snapshot()
+
+    shutil.rmtree(output_folder, ignore_errors=True)
+
+    return {
+        "concurrency": concurrency,
+        "jobs": jobs,
+        "done": snapshot["jobs"].get("done", 0),
+        "failed": [
+            {"id": job.id, "status": job.status, "error": job.error}
+            for job in batch if job.status != "done"
+        ],
+        "wall_seconds": round(wall, 3),
+        "jobs_per_minute": round(snapshot["jobs"].get("done", 0) / wall * 60, 2),
+        "mb_per_second": round(megabytes / wall, 2),
+        "megabytes": round(megabytes, 2),
+        "stages": snapshot["stages"],
+    }
+
+
+def format_report(results):
+    header = f"{'conc':>4} {'jobs':>5} {'failed':>6} {'wall s':>8} {'jobs/min':>9} {'MB/s':>7}"
+    header += "".join(f" {stage + ' p50/p95':>20}" for stage in STAGE_NAMES)
+    lines = [header]
+
+    for r in results:
+        line = (f"{r['concurrency']:>4} {r['jobs']:>5} {len(r['failed']):>6} {r['wall_seconds']:>8.2f} "
+                f"{r['jobs_per_minute']:>9.2f} {r['mb_per_second']:>7.2f}")
+        for stage in STAGE_NAMES:
+            wall = r["stages"].get(stage, {}).get("wall_seconds")
+            cell = f"{wall['p50']:.2f}/{wall['p95']:.2f}s" if wall else "-"
+            line += f" {cell:>20}"
+        lines.append(line)
+
+    return "\n".join(lines)
+
+
+# ================================================================
+#  ENTRY POINT
+# ================================================================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Offline end-to-end benchmark: synthetic audio from a local "
+                    "HTTP server through the full extract → download → transcode "
+                    "pipeline, at several concurrency levels.",
+    )
+    parser.add_argument("-c", "--concurrency", type=int, nargs="+", default=list(DEFAULT_CONCURRENCY),
+                        help="workers per stage to try, one batch each")
+    parser.add_argument("-n", "--jobs", type=int, default=DEFAULT_JOBS, help="jobs per batch")
+    parser.add_argument("--sources", type=int, default=DEFAULT_SOURCES, help="distinct synthetic tracks")
+    parser.add_argument("--duration", type=int, default=DEFAULT_DURATION, help="seconds of audio per track")
+    parser.add_argument("-f", "--format", default="mp3", choices=sorted(TARGETS))
+    parser.add_argument("--also", action="append", default=[], metavar="FORMAT[:BITRATE]",
+                        help="extra output per job from the same decode (repeatable)")
+    parser.add_argument("--ffmpeg", default="ffmpeg", help="ffmpeg executable")
+    parser.add_argument("--connections", type=int, default=1, help="connections per download")
+    parser.add_argument("--encoders", type=int, default=0, help="ffmpeg processes at once, 0 = one per core")
+    parser.add_argument("--no-stream", action="store_true", help="always go through a temp file")
+    parser.add_argument("--transcode-cache-mb", type=int, default=0,
+                        help="transcode cache size; off by default so every job really encodes")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    parser.add_argument("-v", "--verbose", action="store_true", help="engine log on stderr")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sys.stderr.reconfigure(errors="replace")
+
+    set_encoders(args.encoders)
+    set_transcode_cache(args.transcode_cache_mb)
+    media_folder = os.path.join(BENCH_DIR, "media")
+    make_media(args.ffmpeg, media_folder, args.sources, args.duration)
+    server = MediaServer(media_folder, args.sources, args.duration)
+
+    if args.verbose:
+        events.listen(lambda event: print(event, file=sys.stderr, flush=True), kinds=(LogLine,))
+
+    print(f"🏁 yt-dlp {yt_dlp.version.__version__} • {args.jobs} jobs × {args.duration}s "
+          f"{args.format} • media at {server.base_url}", file=sys.stderr)
+
+    job_queue = JobQueue(1, 1, 1)
+    job_options = {
+        "output_format": args.format,
+        "ffmpeg_path": args.ffmpeg,
+        "stream": not args.no_stream,
+        "connections": args.connections,
+        "extra_outputs": args.also,
+    }
+
+    results = []
+    for concurrency in args.concurrency:
+        result = run_level(job_queue, server, concurrency, args.jobs, job_options)
+        results.append(result)
+        for failure in result["failed"]:
+            print(f"❌ Job #{failure['id']} {failure['status']}: {failure['error']}", file=sys.stderr)
+
+    print(format_report(results))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+    return 1 if any(r["failed"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
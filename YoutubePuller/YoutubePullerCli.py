@@ -0,0 +1,344 @@
+﻿import sys
+import json
+import signal
+import argparse
+import threading
+import configparser
+
+# Engine only: nothing here may pull in tkinter or the GUI scripts
+from YoutubePullerEngine import (
+    DEFAULT_CONNECTIONS,
+    DEFAULT_ENCODERS,
+    DEFAULT_OUTPUT_STORE,
+    DEFAULT_EXTRACT_WORKERS,
+    DEFAULT_PROGRESS_INTERVAL,
+    DEFAULT_RATE_LIMIT_KBPS,
+    DEFAULT_TRANSCODE_CACHE_MB,
+    DEFAULT_TRANSCODE_WORKERS,
+    DEFAULT_WORKERS,
+    FINISHED,
+    Job,
+    JobQueue,
+    events,
+    export_metrics,
+    gui_print,
+    normalize_and_validate_input,
+    output_store,
+    set_encoders,
+    set_output_store,
+    set_progress_interval,
+    set_rate_limit,
+    set_transcode_cache,
+)
+from YoutubePullerApi import DEFAULT_API_HOST, serve_api
+from YoutubePullerEvents import JobDone, LogLine
+from YoutubePullerFormats import TARGETS, parse_output
+from YoutubePullerWatch import watch_drop_folder
+
+# ================================================================
+#  SETTINGS / ARGUMENTS
+# ================================================================
+def read_defaults(ini_path):
+    """
+    Flag defaults, taken from a settings.ini (same keys as the GUI) if given.
+    """
+    config = configparser.ConfigParser()
+    if ini_path:
+        config.read(ini_path)
+
+    return {
+        "ffmpeg": config.get("config", "ffmpeg_path", fallback="ffmpeg"),
+        "output_folder": config.get("config", "output_folder", fallback="."),
+        "workers": config.getint("config", "workers", fallback=DEFAULT_WORKERS),
+        "extract_workers": config.getint("config", "extract_workers", fallback=DEFAULT_EXTRACT_WORKERS),
+        "transcode_workers": config.getint("config", "transcode_workers", fallback=DEFAULT_TRANSCODE_WORKERS),
+        "encoders": config.getint("config", "encoders", fallback=DEFAULT_ENCODERS),
+        "output_store": config.getboolean("config", "output_store", fallback=DEFAULT_OUTPUT_STORE),
+        "transcode_cache_mb": config.getint("config", "transcode_cache_mb", fallback=DEFAULT_TRANSCODE_CACHE_MB),
+        "connections": config.getint("config", "connections", fallback=DEFAULT_CONNECTIONS),
+        "rate_limit_kbps": config.getint("config", "rate_limit_kbps", fallback=DEFAULT_RATE_LIMIT_KBPS),
+        "api_port": config.getint("config", "api_port", fallback=0),
+        "progress_interval": config.getfloat("config", "progress_interval", fallback=DEFAULT_PROGRESS_INTERVAL),
+        "watch": config.get("config", "watch_folder", fallback="") or None,
+    }
+
+
+def output_spec(spec):
+    parse_output(spec)   # ValueError → argparse reports the bad value
+    return spec
+
+
+def parse_args(argv=None):
+    pre = argparse.ArgumentParser(add_help=False)
+    pre.add_argument("--config")
+    known, _ = pre.parse_known_args(argv)
+
+    parser = argparse.ArgumentParser(
+        description="Headless YoutubePuller: downloads every URL listed in the "
+                    "input files (or stdin) and writes one JSON result per job.",
+        parents=[pre],
+    )
+    parser.add_argument("inputs", nargs="*",
+                        help="files with URLs, one or more per line ('-' = stdin, the default "
+                             "unless --watch is given)")
+    parser.add_argument("-o", "--output-folder")
+    parser.add_argument("-f", "--format", default="mp3", choices=sorted(TARGETS))
+    parser.add_argument("--also", action="append", default=[], type=output_spec, metavar="FORMAT[:BITRATE]",
+                        help="extra output from the same download and decode, e.g. opus or mp3:320k (repeatable)")
+    parser.add_argument("--ffmpeg", help="ffmpeg executable")
+    parser.add_argument("-r", "--results", help="append JSON-lines results here (default: stdout)")
+    parser.add_argument("--workers", type=int, help="parallel downloads")
+    parser.add_argument("--extract-workers", type=int)
+    parser.add_argument("--transcode-workers", type=int)
+    parser.add_argument("--encoders", type=int, help="file encodes at once, 0 = one per core (streamed jobs aren't counted)")
+    parser.add_argument("--connections", type=int, help="connections per download")
+    parser.add_argument("--rate-limit-kbps", type=int, help="bandwidth cap for all jobs, 0 = unlimited")
+    parser.add_argument("--no-skip", action="store_true", help="download again even if archived")
+    parser.add_argument("--no-stream", action="store_true", help="always go through a temp file")
+    parser.add_argument("--no-store", dest="output_store", action="store_false",
+                        help="don't deduplicate identical outputs into hardlinks")
+    parser.add_argument("--transcode-cache-mb", type=int,
+                        help="disk for cached conversions reused instead of re-encoding, 0 = off")
+    parser.add_argument("--have", nargs="+", metavar="FILE",
+                        help="only look up whether the output folder already has these files' audio")
+    parser.add_argument("--expand-lists", action="store_true",
+                        help="expand watch?v=…&list=… links into the whole playlist")
+    parser.add_argument("--daemon", action="store_true",
+                        help="resume unfinished jobs and keep running after the input ends")
+    parser.add_argument("--watch", metavar="FOLDER",
+                        help="queue video files and .txt URL lists dropped into FOLDER; keeps running")
+    parser.add_argument("--api-port", type=int,
+                        help=f"serve the job API on {DEFAULT_API_HOST}:PORT (0 = off)")
+    parser.add_argument("--progress-interval", type=float, help="seconds between progress snapshots")
+    parser.add_argument("--metrics-json", help="write per-stage timings (p50/p95/totals) to this JSON file")
+    parser.add_argument("--metrics-prom", help="write them as a Prometheus textfile (node_exporter collector)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="no log output on stderr")
+
+    parser.set_defaults(**read_defaults(known.config))
+    return parser.parse_args(argv)
+
+
+# ================================================================
+#  INPUT / RESULTS
+# ================================================================
+def iter_entries(f):
+    """
+    Yields every whitespace-separated entry of an input file;
+    blank lines and lines starting with # are skipped.
+    """
+    for line in f:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield from line.split()
+
+
+def report_have(args):
+    """
+    One JSON line per --have file with the titles in the output folder
+    that have the same content; exit code 1 if any file has none.
+    """
+    store = output_store(args.output_folder)
+    missing = 0
+
+    for path in args.have:
+        matches = store.have(path)
+        missing += not matches
+        print(json.dumps({"file": path, "have": matches}, ensure_ascii=False), flush=True)
+
+    return 1 if missing else 0
+
+
+def job_result(job):
+    return {
+        name: value for name, value in job.describe().items()
+        if name in ("id", "url", "status", "format", "mode", "reason", "output_file", "extra_files", "error")
+    }
+
+
+class ResultsWriter:
+    """
+    One JSON object per line, flushed as each job finishes, so the
+    file is usable while the batch is still running.
+    """
+
+    def __init__(self, path=None):
+        self.lock = threading.Lock()
+        self.f = open(path, "a", encoding="utf-8") if path else sys.stdout
+        self.reported = set()
+        self.failed = 0
+
+    def write(self, record):
+        with self.lock:
+            self.f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.f.flush()
+            if record["status"] not in ("done", "skipped"):
+                self.failed += 1
+
+    def write_job(self, job):
+        if job.status in FINISHED and job.id not in self.reported:
+            self.reported.add(job.id)
+            self.write(job_result(job))
+
+    def write_finished(self, jobs):
+        for job in list(jobs):
+            self.write_job(job)
+
+    def close(self):
+        if self.f is not sys.stdout:
+            self.f.close()
+
+
+# ================================================================
+#  BATCH / DAEMON
+# ================================================================
+def job_options_from(args):
+    return {
+        "output_folder": args.output_folder,
+        "output_format": args.format,
+        "ffmpeg_path": args.ffmpeg,
+        "skip_existing": not args.no_skip,
+        "stream": not args.no_stream,
+        "connections": args.connections,
+        "extra_outputs": args.also,
+    }
+
+
+def invalid_result(args, raw_input, error):
+    return {"id": None, "url": raw_input, "status": "invalid", "format": args.format,
+            "mode": None, "output_file": None, "error": error}
+
+
+def queue_input(args, job_queue, results, raw_input, job_options, expanders):
+    url_or_file, input_type = normalize_and_validate_input(raw_input)
+
+    if not url_or_file:
+        gui_print(f"❌ Invalid input: {raw_input}")
+        results.write(invalid_result(args, raw_input, "Not a YouTube URL, local video file or folder"))
+        return
+
+    if input_type == "youtube" and args.expand_lists and "list=" in url_or_file:
+        input_type = "playlist"
+
+    if input_type == "playlist":
+        gui_print(f"📃 Expanding playlist / channel: {url_or_file}")
+        expanders.append(job_queue.submit_playlist(url_or_file, **job_options))
+        return
+
+    if input_type == "folder":
+        gui_print(f"📂 Scanning folder for videos: {url_or_file}")
+        expanders.append(job_queue.submit_folder(url_or_file, **job_options))
+        return
+
+    job = job_queue.submit(Job(url_or_file, **job_options))
+    gui_print(f"➕ Queued job #{job.id}: {url_or_file}")
+
+
+def queue_inputs(args, job_queue, results):
+    job_options = job_options_from(args)
+
+    if args.daemon and job_queue.resume_unfinished():
+        gui_print("↩ Resumed unfinished jobs from the journal")
+
+    expanders = []
+    for path in args.inputs or ([] if args.watch else ["-"]):
+        try:
+            f = sys.stdin if path == "-" else open(path, encoding="utf-8-sig")
+        except OSError as e:
+            # Reported like an invalid URL: a JSON line and exit code 1
+            gui_print(f"❌ Can't read input file {path}: {e.strerror or e}")
+            results.write(invalid_result(args, path, f"Can't read input file: {e.strerror or e}"))
+            continue
+
+        try:
+            for raw_input in iter_entries(f):
+                queue_input(args, job_queue, results, raw_input, job_options, expanders)
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+    for expander in expanders:
+        expander.join()
+
+
+def feed_jobs(args, job_queue, results, fed):
+    """
+    Queues the inputs on its own thread. `fed` is always set in the
+    end, whatever goes wrong here, so main() never waits on a dead
+    feeder.
+    """
+    # A daemon (or drop folder watcher) keeps serving after its input runs dry
+    keep_serving = args.daemon or args.watch
+
+    try:
+        queue_inputs(args, job_queue, results)
+    except Exception as e:
+        gui_print(f"❌ Reading the inputs failed: {e}")
+        results.write(invalid_result(args, None, f"Reading the inputs failed: {e}"))
+        keep_serving = False
+    finally:
+        if not keep_serving:
+            job_queue.join()
+            fed.set()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Emoji log lines must not kill the run on a narrow console encoding
+    sys.stderr.reconfigure(errors="replace")
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    if args.have:
+        return report_have(args)
+
+    set_rate_limit(args.rate_limit_kbps)
+    set_encoders(args.encoders)
+    set_output_store(args.output_store)
+    set_transcode_cache(args.transcode_cache_mb)
+    set_progress_interval(args.progress_interval)
+    subscription = events.subscribe(kinds=(LogLine, JobDone))
+    exporter = None
+    if args.metrics_json or args.metrics_prom:
+        exporter = export_metrics(args.metrics_json, args.metrics_prom)
+    job_queue = JobQueue(args.workers, args.extract_workers, args.transcode_workers)
+    results = ResultsWriter(args.results)
+
+    if args.api_port:
+        serve_api(job_queue, job_options_from(args), port=args.api_port)
+
+    if args.watch:
+        try:
+            watch_drop_folder(args.watch, job_queue, job_options_from(args))
+        except (OSError, RuntimeError) as e:
+            print(f"❌ Can't watch {args.watch}: {e}", file=sys.stderr)
+            results.close()
+            return 2
+
+    fed = threading.Event()
+    threading.Thread(
+        target=feed_jobs, args=(args, job_queue, results, fed), daemon=True
+    ).start()
+
+    try:
+        while not (fed.is_set() and subscription.empty()):
+            event = subscription.get(timeout=0.2)
+
+            if isinstance(event, JobDone):
+                job = job_queue.get(event.job_id)
+                if job:   # None only if FINISHED_JOBS_KEPT newer jobs finished meanwhile
+                    results.write_job(job)
+            elif isinstance(event, LogLine) and not args.quiet:
+                print(event, file=sys.stderr, flush=True)
+    except KeyboardInterrupt:
+        print("⏹ Stopped; unfinished jobs resume with --daemon or in the GUI", file=sys.stderr)
+    finally:
+        results.write_finished(job_queue.snapshot())
+        results.close()
+        if exporter:
+            exporter.flush()
+
+    return 1 if results.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+﻿import os
+import itertools
+from collections import deque
+
+import tkinter as tk
+
+from YoutubePullerEvents import LEVELS, message_level
+
+# ================================================================
+#  CONSOLE DEFAULTS
+# ================================================================
+# Lines kept in memory; older ones only live in the spill file
+CONSOLE_LINES = 5000
+
+# The spill file is rotated (→ .1) once it grows past this
+SPILL_MAX_BYTES = 10 * 1024 * 1024
+
+
+# ================================================================
+#  RING BUFFER WITH SPILL FILE
+# ================================================================
+class LogRing:
+    """
+    The newest `capacity` log lines, plus the subset passing the level
+    filter. Lines pushed out of the ring are appended to `spill_path`,
+    so nothing is lost but memory stays flat.
+    """
+
+    def __init__(self, capacity=CONSOLE_LINES, spill_path=None, min_level="info"):
+        self.lines = deque()
+        self.visible = deque()    # lines at or above min_level, oldest first
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self.spill = None
+        self.min_rank = LEVELS.index(min_level)
+        self.seq = itertools.count()
+
+    def append(self, msg, level=None):
+        line = (next(self.seq), LEVELS.index(level or message_level(msg)), msg.rstrip())
+        self.lines.append(line)
+        if line[1] >= self.min_rank:
+            self.visible.append(line)
+
+        if len(self.lines) > self.capacity:
+            oldest = self.lines.popleft()
+            if self.visible and self.visible[0] is oldest:
+                self.visible.popleft()
+            self._spill(oldest[2])
+
+    def set_level(self, level):
+        self.min_rank = LEVELS.index(level)
+        self.visible = deque(line for line in self.lines if line[1] >= self.min_rank)
+
+    def window(self, start, count):
+        return [line[2] for line in itertools.islice(self.visible, start, start + count)]
+
+    def _spill(self, text):
+        if not self.spill_path:
+            return
+
+        if self.spill is None:
+            os.makedirs(os.path.dirname(self.spill_path), exist_ok=True)
+            self.spill = open(self.spill_path, "a", encoding="utf-8")
+
+        self.spill.write(text + "\n")
+
+        if self.spill.tell() > SPILL_MAX_BYTES:
+            self.spill.close()
+            os.replace(self.spill_path, self.spill_path + ".1")
+            self.spill = None
+
+    def flush(self):
+        if self.spill:
+            self.spill.flush()
+
+
+# ================================================================
+#  VIRTUALIZED CONSOLE WIDGET
+# ================================================================
+class VirtualConsole(tk.Frame):
+    """
+    Text console that only ever holds the lines on screen. The
+    scrollbar moves a window over the LogRing; redraws are batched
+    into refresh(), so a burst of messages costs one repaint.
+    """
+
+    def __init__(self, master, width=100, height=22, ring=None, **text_options):
+        super().__init__(master)
+
+        self.ring = ring or LogRing()
+        self.height = height
+        self.top = 0           # index into ring.visible of the first shown line
+        self.follow = True     # stick to the newest line
+        self.dirty = True
+
+        self.text = tk.Text(self, width=width, height=height, wrap="none", **text_options)
+        self.scrollbar = tk.Scrollbar(self, command=self._on_scrollbar)
+        self.text.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+        self.text.configure(state="disabled")
+
+        for widget in (self.text, self.scrollbar):
+            widget.bind("<MouseWheel>", self._on_wheel)
+            widget.bind("<Button-4>", lambda e: self.scroll(-3))
+            widget.bind("<Button-5>", lambda e: self.scroll(3))
+
+    def append(self, msg, level=None):
+        self.ring.append(msg, level)
+        self.dirty = True
+
+    def set_level(self, level):
+        self.ring.set_level(level)
+        self.follow = True
+        self.dirty = True
+        self.refresh()
+
+    def scroll(self, lines):
+        self.top = max(0, min(self._last_top(), self.top + lines))
+        self.follow = self.top >= self._last_top()
+        self.dirty = True
+        self.refresh()
+
+    def refresh(self):
+        if not self.dirty:
+            return
+        self.dirty = False
+
+        total = len(self.ring.visible)
+        if self.follow:
+            self.top = self._last_top()
+        self.top = min(self.top, self._last_top())
+
+        self.text.configure(state="normal")
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", "\n".join(self.ring.window(self.top, self.height)))
+        self.text.configure(state="disabled")
+
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + self.height) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+        self.ring.flush()
+
+    def _last_top(self):
+        return max(0, len(self.ring.visible) - self.height)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll(int(float(amount) * len(self.ring.visible)) - self.top)
+        elif unit == "pages":
+            self.scroll(int(amount) * self.height)
+        else:
+            self.scroll(int(amount))
+
+    def _on_wheel(self, event):
+        self.scroll(-3 if event.delta > 0 else 3)
@@ -0,0 +1,76 @@
+﻿import os
+import threading
+
+
+# ================================================================
+#  ENCODER DEFAULTS
+# ================================================================
+def usable_cores():
+    """
+    Cores this process may run on (honours CPU affinity / container
+    limits where the OS reports them).
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+CPU_CORES = usable_cores()
+
+# ffmpeg processes encoding files at once; 0 = auto, one per core.
+# LAME, libopus and the AAC encoder are essentially single-threaded,
+# so more processes beat more threads per process.
+DEFAULT_ENCODERS = 0
+
+
+# ================================================================
+#  ENCODER SLOTS (PROCESS-WIDE FFMPEG SCHEDULER)
+# ================================================================
+class EncoderSlots:
+    """
+    Caps how many ffmpeg processes run on downloaded or local files at
+    once and splits the cores between them: each process gets a
+    `-threads` budget of cores // limit, at least 1. Streamed jobs
+    don't take a slot; their ffmpeg paces itself to the network, and
+    the download pool (workers) caps how many there are.
+
+    A limit of 0 means one slot per core. The limit can be changed at
+    any time; running encodes keep their slot and budget.
+    """
+
+    def __init__(self, limit=0, cores=CPU_CORES):
+        self.cond = threading.Condition()
+        self.cores = cores
+        self.limit = cores
+        self.active = 0
+        self.set_limit(limit)
+
+    def set_limit(self, limit):
+        with self.cond:
+            self.limit = max(1, int(limit)) if limit else self.cores
+            self.cond.notify_all()
+
+    def threads(self):
+        return max(1, self.cores // self.limit)
+
+    def full(self):
+        return self.active >= self.limit
+
+    def acquire(self, cancelled=None):
+        """
+        Waits for a free slot and returns the -threads budget to run
+        with, or None if `cancelled()` turned true while waiting.
+        """
+        with self.cond:
+            while self.active >= self.limit:
+                if cancelled and cancelled():
+                    return None
+                self.cond.wait(0.5)
+
+            self.active += 1
+            return self.threads()
+
+    def release(self):
+        with self.cond:
+            self.active -= 1
+            self.cond.notify()
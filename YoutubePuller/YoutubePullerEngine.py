@@ -0,0 +1,1660 @@
+﻿import io
+import os
+import re
+import hashlib
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import itertools
+import time
+from collections import deque
+from contextlib import contextmanager
+from queue import Queue, Empty
+
+import yt_dlp
+from yt_dlp.networking.exceptions import HTTPError
+
+from YoutubePullerArchive import DownloadArchive
+from YoutubePullerEncoders import CPU_CORES, DEFAULT_ENCODERS, EncoderSlots
+from YoutubePullerEvents import (
+    EventBus,
+    FolderScanned,
+    JobDone,
+    JobFailed,
+    JobQueued,
+    JobStarted,
+    LogLine,
+    OutputProduced,
+    PlaylistDone,
+    Progress,
+    StageChanged,
+)
+from YoutubePullerFormats import encode_params, encode_plan, local_plan, negotiate_format, parse_output, scan_plan
+from YoutubePullerJournal import JobJournal
+from YoutubePullerMetaCache import MetadataCache, extract_video_id
+from YoutubePullerMetrics import JobTimings, MetricsExporter, wait_child
+from YoutubePullerProbe import probe_media
+from YoutubePullerProgress import DEFAULT_PROGRESS_INTERVAL, ProgressAggregator, format_progress
+from YoutubePullerRanges import can_fetch_ranges, iter_source, probe_size
+from YoutubePullerRateLimit import TokenBucket
+from YoutubePullerStore import STORE_DIR_NAME, OutputStore, file_digest
+from YoutubePullerTranscodeCache import DEFAULT_TRANSCODE_CACHE_MB, TranscodeCache, cache_key, source_origin
+from YoutubePullerYdlPool import get_pooled_ydl, release_pooled_ydl
+
+# ================================================================
+#  ENGINE DEFAULTS
+# ================================================================
+# Pool sizes of the pipeline stages (extract → download → transcode);
+# DEFAULT_WORKERS is the download pool, the one the GUI calls "parallel jobs"
+DEFAULT_WORKERS = 3
+DEFAULT_EXTRACT_WORKERS = 2
+DEFAULT_TRANSCODE_WORKERS = CPU_CORES   # enough to fill every encoder slot
+
+# -threads of a streamed ffmpeg: it encodes at network speed, one is plenty
+STREAM_THREADS = 1
+
+# Jobs that may wait between two stages before the upstream stage stalls;
+# caps how many downloaded temp files can pile up ahead of the encoder
+STAGE_QUEUE_SIZE = 2
+
+# Finished jobs kept in memory for the API / GUI; older ones are
+# dropped (the journal keeps every job)
+FINISHED_JOBS_KEPT = 1000
+
+# How many expanded playlist entries may wait in the queue before the
+# expander pauses; keeps memory flat on 2,000-item playlists.
+PLAYLIST_LOOKAHEAD = 50
+
+# Local files whose audio gets extracted, alone or found in a folder tree
+VIDEO_EXTENSIONS = (".mp4", ".m4v", ".mov", ".mkv", ".webm", ".avi", ".wmv", ".flv",
+                    ".mpg", ".mpeg", ".ts", ".3gp")
+
+# A folder scan logs how far it got every this many files
+FOLDER_SCAN_REPORT_EVERY = 1000
+
+# Connections per download when the job doesn't say otherwise
+DEFAULT_CONNECTIONS = 1
+
+# Total download bandwidth for all jobs together, in KB/s (0 = unlimited)
+DEFAULT_RATE_LIMIT_KBPS = 0
+
+# Progress of running downloads is written to the log at most this often (s);
+# the snapshots themselves are published every DEFAULT_PROGRESS_INTERVAL
+PROGRESS_LOG_INTERVAL = 5.0
+
+# Per-user state (metadata cache, download archive, job journal, …) lives here
+APP_DATA_DIR = os.path.join(os.path.expanduser("~"), ".youtubepuller")
+
+# Stage timing aggregates, see export_metrics()
+METRICS_JSON_PATH = os.path.join(APP_DATA_DIR, "metrics.json")
+METRICS_PROM_PATH = os.path.join(APP_DATA_DIR, "metrics.prom")
+
+# Finished files are deduplicated by content into each output folder's
+# store (hardlinks), see OutputStore
+DEFAULT_OUTPUT_STORE = True
+
+# Statuses a job never leaves
+FINISHED = ("done", "skipped", "failed", "cancelled")
+
+events = EventBus()
+metadata_cache = MetadataCache(os.path.join(APP_DATA_DIR, "metacache"))
+download_archive = DownloadArchive(os.path.join(APP_DATA_DIR, "archive.tsv"))
+job_journal = JobJournal(os.path.join(APP_DATA_DIR, "journal.sqlite3"))
+bandwidth = TokenBucket(DEFAULT_RATE_LIMIT_KBPS * 1024)
+encoders = EncoderSlots(DEFAULT_ENCODERS)
+progress = ProgressAggregator(DEFAULT_PROGRESS_INTERVAL, finished=FINISHED)
+transcode_cache = TranscodeCache(os.path.join(APP_DATA_DIR, "transcodes"), DEFAULT_TRANSCODE_CACHE_MB * 1048576)
+output_stores = {}
+output_stores_lock = threading.Lock()
+use_output_store = DEFAULT_OUTPUT_STORE
+
+
+# ================================================================
+#  LOGGING (LogLine events, consumed by the GUI / console)
+# ================================================================
+def gui_print(msg: str):
+    if msg:
+        events.publish(LogLine(msg))
+
+
+# ================================================================
+#  JOB
+# ================================================================
+_job_ids = itertools.count(1)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """
+    One URL plus the settings it runs with.
+    Each job carries its own output folder, format and ffmpeg path,
+    so jobs running side by side never touch shared globals.
+    """
+
+    def __init__(self, url, output_folder, output_format, ffmpeg_path,
+                 skip_existing=True, stream=True, connections=DEFAULT_CONNECTIONS,
+                 interactive=False, extra_outputs=()):
+        self.id = next(_job_ids)
+        self.url = url
+        self.output_folder = output_folder
+        self.output_format = output_format
+        self.ffmpeg_path = ffmpeg_path
+        self.skip_existing = skip_existing
+        self.stream = stream   # pipe the download straight into ffmpeg
+        self.connections = max(1, int(connections))   # parallel byte ranges
+        self.interactive = interactive   # draws bandwidth ahead of bulk jobs
+        self.extra_outputs = list(extra_outputs or ())   # "opus", "mp3:320k", … from the same decode
+
+        self.status = "queued"   # queued → running → done / skipped / failed / cancelled
+        self.error = None
+        self.output_file = None
+        self.extra_files = []
+
+        # Live progress (read by the HTTP API)
+        self.step = None         # pipeline stage running now: extract / download / transcode
+        self.downloaded_bytes = 0
+        self.bytes_lock = threading.Lock()   # every range thread counts into downloaded_bytes
+        self.total_bytes = None
+        self.cancelled = False
+        self.timings = JobTimings()   # wall / CPU seconds per stage
+        self.duration = None          # seconds of audio, from the extracted info
+        self.encode_speed = None      # realtime multiple of the ffmpeg run (file encodes only)
+
+        # Crash-recovery state, mirrored into the job journal
+        self.journal_id = None
+        self.stage = None        # extracted → downloaded → converted → cleaned
+        self.source_file = None
+        self.source_size = None
+        self.plan = None         # save / copy / encode, see negotiate_format()
+
+        # Handed from the extract stage to the download stage
+        self.raw_info = None
+        self.info = None
+        self.from_cache = False
+        self.source_origin = None   # finds cached transcodes before downloading, see source_origin()
+
+    def options(self):
+        """
+        Constructor settings, as stored in the journal to rebuild the job.
+        """
+        return {
+            "output_folder": self.output_folder,
+            "output_format": self.output_format,
+            "ffmpeg_path": self.ffmpeg_path,
+            "skip_existing": self.skip_existing,
+            "stream": self.stream,
+            "connections": self.connections,
+            "interactive": self.interactive,
+            "extra_outputs": self.extra_outputs,
+        }
+
+    def describe(self):
+        """
+        JSON-ready summary of the job and its progress.
+        """
+        percent = None
+        if self.total_bytes:
+            percent = round(min(100.0, 100.0 * self.downloaded_bytes / self.total_bytes), 1)
+
+        speed, eta = progress.rate(self.id)
+
+        return {
+            "id": self.id,
+            "url": self.url,
+            "status": self.status,
+            "step": self.step,
+            "stage": self.stage,
+            "format": self.output_format,
+            "mode": self.plan["mode"] if self.plan else None,
+            "reason": self.plan["reason"] if self.plan else None,
+            "downloaded_bytes": self.downloaded_bytes,
+            "total_bytes": self.total_bytes,
+            "percent": percent,
+            "speed": speed,
+            "eta": eta,
+            "encode_speed": self.encode_speed,
+            "output_file": self.output_file,
+            "extra_files": self.extra_files,
+            "error": self.error,
+        }
+
+    def throttle(self, amount):
+        """
+        Called for every `amount` bytes downloaded: counts them, waits
+        for bandwidth and is where a cancelled download stops.
+        """
+        if self.cancelled:
+            raise JobCancelled("Cancelled")
+
+        with self.bytes_lock:
+            self.downloaded_bytes += amount
+        bandwidth.consume(amount, self.interactive)
+
+    def log(self, msg, level=None):
+        if msg:
+            events.publish(LogLine(msg, self.id, level))
+
+
+def checkpoint(job, stage, **fields):
+    """
+    Records that `job` completed `stage` (plus any file paths / sizes
+    that go with it) in memory and in the journal.
+    """
+    job.stage = stage
+    for name, value in fields.items():
+        setattr(job, name, value)
+
+    if job.journal_id:
+        job_journal.save(job.journal_id, stage=stage, **fields)
+
+
+def set_status(job, status, error=None):
+    job.status = status
+    job.error = error
+
+    if job.journal_id:
+        job_journal.save(
+            job.journal_id, status=status, error=error, output_file=job.output_file
+        )
+
+    if status == "running":
+        events.publish(JobStarted(job.id))
+    elif status == "failed":
+        events.publish(JobFailed(job.id, error))
+
+
+# ================================================================
+#  YT-DLP LOGGER + PROGRESS HOOK
+# ================================================================
+class GuiLogger:
+    def __init__(self, job):
+        self.job = job
+
+    def debug(self, msg):
+        self.job.log(msg)
+
+    def info(self, msg):
+        self.job.log(msg)
+
+    def warning(self, msg):
+        self.job.log("WARNING: " + msg, "warning")
+
+    def error(self, msg):
+        self.job.log("ERROR: " + msg, "error")
+
+
+def set_rate_limit(kbps):
+    """
+    Changes the process-wide bandwidth cap; running downloads follow at once.
+    """
+    bandwidth.set_rate(max(0, kbps) * 1024)
+
+
+def set_encoders(limit):
+    """
+    Changes how many ffmpeg processes may run at once (0 = one per core).
+    """
+    encoders.set_limit(limit)
+
+
+def set_transcode_cache(mb):
+    """
+    Changes how much disk the transcode cache may use (0 = off); the
+    least recently used results go first.
+    """
+    transcode_cache.set_limit(max(0, mb) * 1048576)
+
+
+def set_output_store(enabled):
+    """
+    Turns content dedup of finished files on or off for new jobs.
+    """
+    global use_output_store
+    use_output_store = bool(enabled)
+
+
+def set_progress_interval(seconds):
+    """
+    Changes how often progress snapshots are published.
+    """
+    progress.set_interval(seconds)
+
+
+def log_progress(snapshot):
+    for state in snapshot.values():
+        if state["status"] == "running" and state["step"] == "download":
+            gui_print(f"[#{state['id']}] [download] {format_progress(state)}")
+
+
+def publish_progress(snapshot):
+    for job_id, state in snapshot.items():
+        events.publish(Progress(job_id, state))
+
+
+progress.subscribe(publish_progress)
+progress.subscribe(log_progress, every=PROGRESS_LOG_INTERVAL)
+
+
+def make_progress_hook(job):
+    last = {"bytes": 0}
+
+    def ytdlp_progress_hook(d):
+        # Only counts bytes: the progress aggregator reports them.
+        # Blocking in throttle() throttles yt-dlp's own downloader.
+        downloaded = d.get("downloaded_bytes") or 0
+        job.total_bytes = d.get("total_bytes") or d.get("total_bytes_estimate") or job.total_bytes
+        if downloaded > last["bytes"]:
+            job.throttle(downloaded - last["bytes"])
+        last["bytes"] = downloaded
+
+        if d["status"] == "finished":
+            job.log("[download] Finished downloading source file")
+
+    return ytdlp_progress_hook
+
+
+# ================================================================
+#  HELPERS
+# ================================================================
+def run_ffmpeg_streamed(cmd, job):
+    job.log("⚙️ Running ffmpeg...")
+
+    p = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+
+    for line in p.stdout:
+        job.log(line.rstrip())
+
+        if job.cancelled:
+            p.kill()
+            p.wait()
+            raise JobCancelled("Cancelled")
+
+    job.timings.add_child_cpu(wait_child(p))
+    if p.returncode != 0:
+        raise RuntimeError(f"ffmpeg exited with code {p.returncode}")
+    job.log("✅ ffmpeg finished.")
+
+
+def summarize_best_format(info, job):
+    if "requested_formats" in info:
+        fmt = info["requested_formats"][0]
+    else:
+        fmt = info
+
+    abr = fmt.get("abr")
+    asr = fmt.get("asr")
+    acodec = fmt.get("acodec")
+    ext = fmt.get("ext")
+
+    job.log(
+        f"🔍 Best format detected: {ext} • {acodec} • "
+        f"{f'{abr} kbps' if abr else 'unknown bitrate'} • "
+        f"{f'{asr} Hz' if asr else 'unknown sample rate'}"
+    )
+
+
+def normalize_and_validate_input(raw_input: str):
+    s = raw_input.strip()
+
+    # Add https:// if missing but looks like YouTube
+    if s.startswith("www.youtube.com") or s.startswith("youtube.com"):
+        s = "https://" + s
+
+    # YouTube URL validation
+    youtube_regex = re.compile(
+        r"^https?://(www\.)?(youtube\.com/watch\?v=|youtu\.be/)[\w\-]+"
+    )
+
+    # Playlist / channel pages → expanded into one job per video
+    playlist_regex = re.compile(
+        r"^https?://(www\.)?youtube\.com/"
+        r"(playlist\?list=|@[\w\-.]+|channel/|c/|user/)[\w\-]*"
+    )
+
+    if playlist_regex.match(s):
+        return s, "playlist"
+
+    if youtube_regex.match(s):
+        return s, "youtube"
+
+    # Local video file, or a folder tree of them
+    if os.path.isfile(s) and is_video_file(s):
+        return s, "local"
+
+    if os.path.isdir(s):
+        return s, "folder"
+
+    return None, None
+
+
+# ================================================================
+#  PLAYLIST / CHANNEL EXPANSION
+# ================================================================
+def iter_playlist_entries(url, log=gui_print):
+    """
+    Yields one watch URL per video in a playlist or channel.
+    Uses flat, lazy extraction so entries stream in page by page
+    instead of resolving the whole playlist up front.
+    """
+    ydl_opts = {
+        "extract_flat": "in_playlist",
+        "lazy_playlist": True,
+        "skip_download": True,
+        "quiet": True,
+    }
+
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        yield from _iter_entries(ydl, url, log)
+
+
+def _iter_entries(ydl, url, log):
+    info = ydl.extract_info(url, download=False, process=False)
+
+    # watch?v=…&list=… resolves to a pointer at the playlist page
+    if info.get("_type") == "url" and info.get("url") and info["url"] != url:
+        yield from _iter_entries(ydl, info["url"], log)
+        return
+
+    if info.get("_type") not in ("playlist", "multi_video"):
+        # A single video was passed in
+        yield info.get("webpage_url") or url
+        return
+
+    log(f"📃 Expanding: {info.get('title') or url}")
+
+    for entry in info.get("entries") or []:
+        if not entry:
+            continue
+
+        entry_url = entry.get("url") or entry.get("webpage_url")
+
+        # Channel pages list their tabs (Videos, Shorts, …) as nested playlists
+        if entry.get("_type") == "playlist" or entry.get("ie_key") == "YoutubeTab":
+            if entry_url:
+                yield from _iter_entries(ydl, entry_url, log)
+            continue
+
+        if not entry_url and entry.get("id"):
+            entry_url = f"https://www.youtube.com/watch?v={entry['id']}"
+
+        if entry_url:
+            yield entry_url
+
+
+# ================================================================
+#  AUDIO CONVERSION
+# ================================================================
+@contextmanager
+def encoder_slot(job):
+    """
+    Holds one of the process-wide ffmpeg slots while the block runs and
+    yields its -threads budget. Runs that only remux (-acodec copy)
+    hardly use any CPU and go without waiting.
+    """
+    modes = [job.plan["mode"]] + [extra["mode"] for extra in job.plan.get("extras", ())]
+    if "encode" not in modes:
+        yield 1
+        return
+
+    if encoders.full():
+        job.log(f"⏳ Waiting for a free encoder ({encoders.limit} busy)")
+
+    threads = encoders.acquire(lambda: job.cancelled)
+    if threads is None:
+        raise JobCancelled("Cancelled")
+
+    try:
+        yield threads
+    finally:
+        encoders.release()
+
+
+def report_encode_speed(job, seconds, threads):
+    if not job.duration or seconds <= 0:
+        job.log(f"⚡ ffmpeg took {seconds:.1f}s on {threads} thread(s)")
+        return
+
+    job.encode_speed = round(job.duration / seconds, 1)
+    job.log(f"⚡ {job.duration / 60:.1f} min of audio in {seconds:.1f}s: "
+            f"{job.encode_speed}× realtime on {threads} thread(s)")
+
+
+def ffmpeg_command(job, source, outputs, threads=1):
+    """
+    One input, decoded once, feeding every (path, ffmpeg args) output.
+    """
+    cmd = [
+        job.ffmpeg_path,
+        "-y",                      # never block on an overwrite prompt
+        "-i", source,
+    ]
+    for output_file, args in outputs:
+        if "copy" not in args:
+            args = [*args, "-threads", str(threads)]   # budget from the encoder slots
+        cmd += ["-vn", *args, output_file]
+    return cmd
+
+
+def output_files_for(job, source_name):
+    """
+    Returns (main output, [extra outputs]) for a source file name. The
+    main one is None when the source itself is kept (save mode); an
+    extra whose name is taken gets its bitrate / format appended.
+    """
+    return output_paths(job.output_folder, job.plan, source_name)
+
+
+def output_paths(output_folder, plan, source_name):
+    base = os.path.join(output_folder, os.path.splitext(os.path.basename(source_name))[0])
+    main = base + "." + plan["ext"]
+    taken = {main}
+
+    extras = []
+    for extra in plan.get("extras", ()):
+        path = base + "." + extra["ext"]
+        if path in taken:
+            path = f"{base} ({extra['bitrate'] or extra['format']}).{extra['ext']}"
+        taken.add(path)
+        extras.append(path)
+
+    return (None if plan["mode"] == "save" else main), extras
+
+
+def ffmpeg_outputs(job, main, extras):
+    outputs = [(main, job.plan["ffmpeg_args"])] if main else []
+    outputs += [(path, extra["ffmpeg_args"]) for path, extra in zip(extras, job.plan.get("extras", ()))]
+    return outputs
+
+
+def log_outputs(job, verb, main, extras):
+    if main:
+        action = "Remuxing" if job.plan["mode"] == "copy" else "Converting"
+        job.log(f"🎵 {verb or action} to {job.plan['ext'].upper()} → {main}")
+    for path, extra in zip(extras, job.plan.get("extras", ())):
+        action = "remux" if extra["mode"] == "copy" else "encode"
+        job.log(f"🎵 + {extra['spec']} ({action}) → {path}")
+
+
+def partial_path(path):
+    """
+    Where ffmpeg writes `path` until the run has succeeded: hidden, so
+    folder scans and the drop folder pass it by, with the real extension
+    ffmpeg picks the container from.
+    """
+    folder, name = os.path.split(path)
+    stem, ext = os.path.splitext(name)
+    return os.path.join(folder, f".{stem}.part{ext}")
+
+
+def partial_outputs(outputs):
+    return [(partial_path(path), args) for path, args in outputs]
+
+
+def publish_outputs(outputs):
+    # A killed ffmpeg must never leave a truncated file under the real
+    # name: it would look up to date. The rename also gives the name a
+    # new inode, so titles hardlinked to the old one keep their audio.
+    for path, _ in outputs:
+        os.replace(partial_path(path), path)
+
+
+def remove_outputs(paths):
+    for path in paths:
+        if path and os.path.exists(path):
+            os.remove(path)
+
+
+def cached_kind(outputs):
+    """
+    The outputs the transcode cache deals with: encodes. A stream copy
+    costs about what fetching it from the cache would, so it isn't
+    worth hashing the source or storing a second copy for.
+    """
+    return [(path, args) for path, args in outputs if "copy" not in args]
+
+
+def outputs_from_cache(job, digest, outputs):
+    """
+    Copies every output the transcode cache has for the source with
+    this hash into place; returns the ones that still need ffmpeg.
+    """
+    if not digest:
+        return outputs
+
+    pending = []
+    for path, args in outputs:
+        if "copy" in args:
+            pending.append((path, args))
+        elif transcode_cache.get(cache_key(digest, os.path.splitext(path)[1], args), path):
+            job.log(f"⚡ From the transcode cache, no encode: {path}")
+        else:
+            pending.append((path, args))
+    return pending
+
+
+def cache_outputs(job, digest, outputs):
+    if not digest:
+        return
+
+    for path, args in cached_kind(outputs):
+        try:
+            transcode_cache.put(cache_key(digest, os.path.splitext(path)[1], args), path)
+        except OSError as e:
+            job.log(f"⚠ Could not add to the transcode cache: {e}")
+    transcode_cache.remember_source(job.source_origin, digest)
+
+
+def convert_audio(input_temp_file, job):
+    """
+    Makes the main output and every extra output from the source file
+    in one ffmpeg run, minus those the transcode cache already has.
+    Returns the main output (None in save mode).
+    """
+    main, extras = output_files_for(job, input_temp_file)
+    log_outputs(job, None, main, extras)
+    outputs = ffmpeg_outputs(job, main, extras)
+
+    digest = file_digest(input_temp_file) if transcode_cache.enabled and cached_kind(outputs) else None
+    pending = outputs_from_cache(job, digest, outputs)
+
+    if pending:
+        with encoder_slot(job) as threads:
+            started = time.perf_counter()
+            try:
+                run_ffmpeg_streamed(ffmpeg_command(job, input_temp_file, partial_outputs(pending), threads), job)
+            except BaseException:
+                remove_outputs(path for path, _ in partial_outputs(pending))   # half an output is no output
+                raise
+            publish_outputs(pending)
+            report_encode_speed(job, time.perf_counter() - started, threads)
+    cache_outputs(job, digest, pending)
+
+    job.extra_files = extras
+    for output_file in ([main] if main else []) + extras:
+        job.log(f"✅ Saved {os.path.splitext(output_file)[1][1:].upper()}: {output_file}")
+    return main
+
+
+# ================================================================
+#  SOURCE STREAM → FFMPEG STDIN / FILE
+# ================================================================
+def _log_ffmpeg_output(stream, job):
+    for line in io.TextIOWrapper(stream, encoding="utf-8", errors="replace"):
+        job.log(line.rstrip())
+
+
+def _log_transfer(job, label, received, total):
+    job.log(
+        f"[{label}] {received / 1048576:.1f} MB"
+        + (f" of {total / 1048576:.1f} MB" if total else "")
+    )
+
+
+def stream_to_ffmpeg(ydl, info, chunks, total, job):
+    """
+    Feeds the source bytes into ffmpeg's stdin as they arrive, so the
+    encode (or remux) overlaps the transfer and nothing touches
+    scratch storage.
+    """
+    output_file, extras = output_files_for(job, ydl.prepare_filename(info))
+    log_outputs(job, "Streaming", output_file, extras)
+    outputs = ffmpeg_outputs(job, output_file, extras)
+    partials = [path for path, _ in partial_outputs(outputs)]
+
+    # The source never lands on disk, so it's hashed on the way through
+    digest = hashlib.sha256() if transcode_cache.enabled and cached_kind(outputs) else None
+    complete = False
+
+    # No encoder slot: a streamed ffmpeg mostly waits on the network,
+    # and the download pool (workers) already caps how many run
+    threads = STREAM_THREADS
+    job.log("⚙️ Running ffmpeg...")
+
+    p = subprocess.Popen(
+        ffmpeg_command(job, "pipe:0", partial_outputs(outputs), threads),
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+
+    reader = threading.Thread(target=_log_ffmpeg_output, args=(p.stdout, job), daemon=True)
+    reader.start()
+
+    received = 0
+
+    try:
+        for data in chunks:
+            p.stdin.write(data)
+            received += len(data)
+            if digest:
+                digest.update(data)
+        complete = True
+    except BrokenPipeError:
+        pass   # ffmpeg exited early; its return code below says why
+    except BaseException:
+        # Cancelled or the transfer broke off: closing stdin would
+        # make ffmpeg finish a truncated but valid-looking file
+        p.kill()
+        p.wait()
+        reader.join()
+        remove_outputs(partials)   # half an output is no output
+        raise
+    finally:
+        try:
+            p.stdin.close()
+        except BrokenPipeError:
+            pass
+
+    job.timings.add_child_cpu(wait_child(p))
+    reader.join()
+
+    if p.returncode != 0:
+        remove_outputs(partials)
+        raise RuntimeError(f"ffmpeg exited with code {p.returncode}")
+
+    publish_outputs(outputs)
+    _log_transfer(job, "stream", received, total)
+    # No encode speed: the run lasted as long as the transfer did
+    job.log("✅ ffmpeg finished.")
+    if digest and complete:
+        cache_outputs(job, digest.hexdigest(), outputs)
+
+    job.extra_files = extras
+    for path in [output_file] + extras:
+        job.log(f"✅ Saved {os.path.splitext(path)[1][1:].upper()}: {path}")
+    return output_file
+
+
+def write_source_file(ydl, info, total, path, job, resume=False):
+    """
+    Writes the ordered byte stream to `path` and checks the result
+    against the size the server reported. With `resume`, a leftover
+    `.part` file from an interrupted run is continued from the byte
+    offset it reached.
+    """
+    part = path + ".part"
+
+    start = os.path.getsize(part) if resume and os.path.exists(part) else 0
+    if total and start > total:
+        start = 0   # the partial file belongs to a different stream
+
+    if start:
+        job.log(f"↩ Resuming download at {start / 1048576:.1f} MB")
+    job.downloaded_bytes = start
+
+    chunks = iter_source(ydl, info, total, job.connections, start, job.throttle)
+    received = start
+
+    with open(part, "ab" if start else "wb") as f:
+        for data in chunks:
+            f.write(data)
+            received += len(data)
+
+    if total and os.path.getsize(part) != total:
+        os.remove(part)
+        raise IOError(f"Downloaded {received} of {total} bytes")
+
+    os.replace(part, path)
+    _log_transfer(job, "download", received, total)
+    job.log(f"[download] Verified {received} bytes over {job.connections} connection(s)")
+    return path
+
+
+def is_local_source(source):
+    return not source.lower().startswith(("http://", "https://"))
+
+
+def is_video_file(path):
+    return path.lower().endswith(VIDEO_EXTENSIONS)
+
+
+def is_inside(path, folder):
+    path, folder = os.path.realpath(path), os.path.realpath(folder)
+    try:
+        return os.path.commonpath([path, folder]) == folder
+    except ValueError:
+        return False   # different drives (Windows)
+
+
+def iter_video_files(folder, skip=None):
+    """
+    Yields every video file under `folder` as soon as it is found,
+    holding one directory listing at a time, so a tree of tens of
+    thousands of files starts converting right away. Hidden entries
+    (the output store among them) and the `skip` subfolder (an output
+    tree inside `folder`) are skipped.
+    """
+    pending = [folder]
+
+    while pending:
+        current = pending.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.name.startswith("."):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.path != skip:
+                            pending.append(entry.path)
+                    elif entry.is_file() and is_video_file(entry.name):
+                        yield entry.path
+        except OSError as e:
+            gui_print(f"⚠ Can't read folder {current}: {e}")
+
+
+def outputs_current(source, output_folder, plan):
+    """
+    True if every output of a local source exists and is no older
+    than the source file. A None plan (see scan_plan()) can't tell.
+    """
+    if plan is None:
+        return False
+
+    main, extras = output_paths(output_folder, plan, source)
+    source_mtime = os.path.getmtime(source)
+
+    return all(
+        os.path.exists(path) and os.path.getmtime(path) >= source_mtime
+        for path in [main] + extras
+    )
+
+
+def prepare_local_source(job):
+    """
+    A local video file needs no extract or download: it goes straight
+    to the transcode stage as the job's source. Its audio codec is
+    probed so a fitting stream is copied out instead of re-encoded.
+    """
+    if not os.path.isfile(job.url):
+        raise ValueError(f"Not a URL or an existing file: {job.url}")
+
+    if job.plan is None:
+        info = probe_media(job.ffmpeg_path, job.url)
+        job.duration = info and info.get("duration")
+        job.plan = local_plan(info, job.output_format, job.extra_outputs)
+        log_plan(job, job.plan)
+
+    main, extras = output_files_for(job, job.url)
+    if any(os.path.abspath(path) == os.path.abspath(job.url) for path in [main] + extras):
+        raise ValueError(f"Output would overwrite the source: {job.url}")
+
+    # A job resumed from the journal was under way: whatever it left
+    # under the output names says nothing about being finished
+    if job.stage in ("converted", "cleaned") and job.output_file and os.path.exists(job.output_file):
+        job.log(f"↩ Resuming after conversion: {job.output_file}")
+        return "transcode"
+
+    if job.skip_existing and job.stage is None and outputs_current(job.url, job.output_folder, job.plan):
+        job.output_file = main
+        job.extra_files = extras
+        set_status(job, "skipped")
+        job.log(f"⏭ Up to date: {main}")
+        return None
+
+    job.log(f"🎞 Extracting audio: {job.url}")
+    checkpoint(job, "downloaded", source_file=job.url, plan=job.plan)
+    return "transcode"
+
+
+def extract_info_cached(ydl, job, use_cache=True):
+    """
+    Returns (info, from_cache). The info is the raw extractor result:
+    full format list, no format selected yet.
+    """
+    video_id = extract_video_id(job.url)
+
+    cached = metadata_cache.get(video_id) if video_id and use_cache else None
+    if cached is not None:
+        job.log(f"⚡ Using cached metadata for {video_id}")
+        return cached, True
+
+    info = ydl.extract_info(job.url, download=False, process=False)
+
+    if video_id:
+        metadata_cache.put(video_id, ydl.sanitize_info(info, remove_private_keys=True))
+
+    return info, False
+
+
+def choose_plan(info, job):
+    """
+    Negotiates how the output gets made (save / copy / encode) and
+    reports which path the job takes and why.
+    """
+    plan = negotiate_format(info, job.output_format, job.extra_outputs)
+    log_plan(job, plan)
+    return plan
+
+
+def log_plan(job, plan):
+    icon = "🎛" if plan["mode"] == "encode" else "📦"
+    job.log(f"{icon} {plan['mode'].capitalize()} path: {plan['reason']}")
+    if plan["extras"]:
+        job.log(f"➕ Also making {', '.join(extra['spec'] for extra in plan['extras'])} "
+                "in the same ffmpeg run")
+
+
+# ================================================================
+#  DOWNLOAD LOGIC
+# ================================================================
+def job_temp_dir(job, create=True):
+    """
+    Stable per-job scratch dir (keyed by the journal ID) so partial
+    downloads survive a crash and can be continued on restart.
+    """
+    name = str(job.journal_id) if job.journal_id else f"job{job.id}"
+    temp_dir = os.path.join(tempfile.gettempdir(), "youtubepuller", name)
+    if create:
+        os.makedirs(temp_dir, exist_ok=True)
+    return temp_dir
+
+
+def configure_for_plan(job):
+    """
+    Switches this thread's long-lived YoutubeDL over to the job's plan.
+    Kept files go straight to the output folder, the rest via temp.
+    """
+    folder = job.output_folder if job.plan["mode"] == "save" else job_temp_dir(job)
+
+    return get_pooled_ydl().configure(
+        job.plan["format_id"],
+        os.path.join(folder, "%(title)s.%(ext)s"),
+        job.ffmpeg_path,
+        GuiLogger(job),
+        make_progress_hook(job),
+    )
+
+
+def extract_source(job, use_cache=True):
+    """
+    Extracts the metadata, negotiates the plan and selects the format.
+    """
+    ydl = get_pooled_ydl().configure(
+        "bestaudio/best",
+        os.path.join(job_temp_dir(job), "%(title)s.%(ext)s"),
+        job.ffmpeg_path,
+        GuiLogger(job),
+        make_progress_hook(job),
+    )
+
+    job.raw_info, job.from_cache = extract_info_cached(ydl, job, use_cache)
+    job.plan = choose_plan(job.raw_info, job)
+
+    ydl = configure_for_plan(job)
+    job.info = ydl.process_ie_result(job.raw_info, download=False)
+    job.duration = job.info.get("duration")
+    summarize_best_format(job.info, job)
+
+    checkpoint(job, "extracted", plan=job.plan)
+
+
+def fetch_from_cache(job, ydl, info):
+    """
+    Makes every output straight from the transcode cache when this
+    source was fetched before and all its outputs are still cached:
+    no download, no ffmpeg.
+    """
+    digest = transcode_cache.source_digest(job.source_origin) if transcode_cache.enabled else None
+    if not digest:
+        return False
+
+    main, extras = output_files_for(job, ydl.prepare_filename(info))
+    outputs = ffmpeg_outputs(job, main, extras)
+    if cached_kind(outputs) != outputs or not all(transcode_cache.has(cache_key(digest, os.path.splitext(path)[1], args)) for path, args in outputs):
+        return False
+
+    job.log("⚡ Source converted before, taking every output from the transcode cache")
+    if outputs_from_cache(job, digest, outputs):
+        return False   # evicted in the meantime: fetch as usual
+
+    job.output_file = main
+    job.extra_files = extras
+    checkpoint(job, "converted", output_file=main)
+    return True
+
+
+def fetch_source(job):
+    """
+    Gets the source audio onto disk (checkpoint "downloaded") or, when
+    streamed, straight through ffmpeg into the final output (checkpoint
+    "converted").
+    """
+    ydl = configure_for_plan(job)
+    info = job.info
+    job.downloaded_bytes = 0
+    job.source_origin = source_origin(info)
+
+    if job.plan["mode"] != "save" and fetch_from_cache(job, ydl, info):
+        return
+
+    streaming = job.stream and job.plan["mode"] != "save"
+    use_ranges = streaming or job.connections > 1
+
+    if use_ranges and can_fetch_ranges(info):
+        total = probe_size(ydl, info)
+        job.total_bytes = total
+
+        # A .part file is only continued if it belongs to the same stream
+        resume = job.source_size == total
+        checkpoint(job, "extracted", source_size=total)
+
+        if streaming:
+            chunks = iter_source(ydl, info, total, job.connections, throttle=job.throttle)
+            job.output_file = stream_to_ffmpeg(ydl, info, chunks, total, job)
+            checkpoint(job, "converted", output_file=job.output_file)
+            return
+
+        dl_file = write_source_file(
+            ydl, info, total, ydl.prepare_filename(info), job, resume
+        )
+    else:
+        if use_ranges:
+            job.log("↪ Format can't be fetched by range, using yt-dlp's downloader")
+
+        # yt-dlp continues its own .part file from the stable temp dir
+        info = ydl.process_ie_result(job.raw_info, download=True)
+
+        if "requested_downloads" in info:
+            dl_file = info["requested_downloads"][0]["filepath"]
+        else:
+            dl_file = info["filepath"]
+
+    checkpoint(job, "downloaded", source_file=dl_file)
+
+
+def finish_source(job, dl_file):
+    if job.plan["mode"] == "save":
+        job.output_file = dl_file
+        job.log(f"🎵 Saved {job.plan['ext'].upper()}: {dl_file}")
+        if job.plan.get("extras"):
+            convert_audio(dl_file, job)
+            checkpoint(job, "converted", output_file=job.output_file)
+    else:
+        job.output_file = convert_audio(dl_file, job)
+        checkpoint(job, "converted", output_file=job.output_file)
+
+
+# ================================================================
+#  PIPELINE STAGES
+# ================================================================
+# Each stage takes a job and returns the name of the next stage, or
+# None once the job is finished (done / skipped).
+def extract_stage(job):
+    set_status(job, "running")
+    os.makedirs(job.output_folder, exist_ok=True)
+
+    if is_local_source(job.url):
+        return prepare_local_source(job)
+
+    # Resumed jobs finish their own run instead (see prepare_local_source())
+    existing = find_archived_output(job) if job.skip_existing and job.stage is None else None
+    if existing:
+        job.output_file = existing
+        set_status(job, "skipped")
+        job.log(f"⏭ Already downloaded: {existing}")
+        return None
+
+    job.log(f"🎧 Downloading: {job.url}")
+
+    # Resumed jobs skip the stages they already completed
+    if job.stage in ("converted", "cleaned") and job.output_file and os.path.exists(job.output_file):
+        job.log(f"↩ Resuming after conversion: {job.output_file}")
+        return "transcode"
+
+    if job.stage == "downloaded" and job.source_file and os.path.exists(job.source_file):
+        job.log(f"↩ Resuming from downloaded source: {job.source_file}")
+        if job.plan is None:
+            job.plan = encode_plan(job.output_format, "resumed without a recorded plan", job.extra_outputs)
+        return "transcode"
+
+    with job.timings.measure("extract"):
+        extract_source(job)
+    return "download"
+
+
+def download_stage(job):
+    # Streamed jobs encode while downloading, so their ffmpeg time lands here
+    with job.timings.measure("download"):
+        try:
+            fetch_source(job)
+        except (HTTPError, yt_dlp.utils.DownloadError) as e:
+            if not job.from_cache:
+                raise
+
+            # Stream URLs in the cached entry expired
+            job.log(f"♻ Cached metadata failed ({e}), re-extracting")
+            metadata_cache.invalidate(extract_video_id(job.url))
+
+            extract_source(job, use_cache=False)
+            fetch_source(job)
+
+    # The extracted info isn't needed past this point
+    job.raw_info = job.info = None
+    return "transcode"
+
+
+def transcode_stage(job):
+    if job.stage == "downloaded":
+        with job.timings.measure("convert"):
+            finish_source(job, job.source_file)
+
+    if use_output_store:
+        with job.timings.measure("store"):
+            store_outputs(job)
+
+    with job.timings.measure("cleanup"):
+        temp_dir = job_temp_dir(job, create=False)
+        if os.path.isdir(temp_dir):
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            job.log(f"🗑 Deleted temp files: {temp_dir}")
+        checkpoint(job, "cleaned", output_file=job.output_file)
+
+    job.log(f"📁 Final Output Folder: {job.output_folder}")
+    job.log(f"⏱ {job.timings.summary()}")
+    for output_file in [job.output_file] + job.extra_files:
+        events.publish(OutputProduced(job.id, output_file))
+
+    archive_output(job)
+    set_status(job, "done")
+    return None
+
+
+STAGES = {
+    "extract": extract_stage,
+    "download": download_stage,
+    "transcode": transcode_stage,
+}
+
+
+def run_stage(name, job):
+    """
+    Runs one stage of `job`. Returns the next stage, or None once the
+    job is finished; a failing stage fails the whole job.
+    """
+    job.step = name
+    progress.track(job)
+    events.publish(StageChanged(job.id, name))
+
+    try:
+        if job.cancelled:
+            raise JobCancelled("Cancelled")
+        next_stage = STAGES[name](job)
+    except JobCancelled:
+        if job.status != "cancelled":
+            set_status(job, "cancelled")
+        job.log("⏹ Cancelled")
+        shutil.rmtree(job_temp_dir(job, create=False), ignore_errors=True)
+        next_stage = None
+    except Exception as e:
+        set_status(job, "failed", str(e))
+        job.log(f"❌ Error: {e}")
+        shutil.rmtree(job_temp_dir(job, create=False), ignore_errors=True)
+        next_stage = None
+
+    if next_stage is None:
+        job.step = None
+        job.raw_info = job.info = None
+        events.publish(JobDone(job.id, job.status, job.output_file, job.timings.stages))
+
+    return next_stage
+
+
+def get_video_info(url: str):
+    """
+    Metadata lookup (title, duration, formats) without downloading.
+    """
+    video_id = extract_video_id(url)
+
+    info = metadata_cache.get(video_id) if video_id else None
+    if info is not None:
+        return info
+
+    with yt_dlp.YoutubeDL({"quiet": True, "noplaylist": True}) as ydl:
+        info = ydl.sanitize_info(
+            ydl.extract_info(url, download=False, process=False), remove_private_keys=True
+        )
+
+    if video_id:
+        metadata_cache.put(video_id, info)
+
+    return info
+
+
+def find_archived_output(job):
+    """
+    Returns the existing output for this video / format / encode
+    settings, checked before any extraction happens. With extra
+    outputs, only if every one of them exists too (then listed in
+    job.extra_files). Files recorded in another folder are linked
+    (or copied) into the job's output folder first.
+    """
+    video_id = extract_video_id(job.url)
+    if not video_id:
+        return None
+
+    wanted = [(job.output_format, encode_params(job.output_format))]
+    for spec in job.extra_outputs:
+        output_format, bitrate = parse_output(spec)
+        wanted.append((output_format, encode_params(output_format, bitrate)))
+
+    found = []
+    for output_format, params in wanted:
+        path = download_archive.lookup(video_id, output_format, params)
+        if not path:
+            return None
+        found.append(path)
+
+    placed = []
+    for (output_format, params), path in zip(wanted, found):
+        copy = place_in_folder(path, job.output_folder)
+        if copy != path:
+            job.log(f"📋 Downloaded before into another folder ({path}), placed here: {copy}")
+            download_archive.add(video_id, output_format, params, copy)
+        placed.append(copy)
+
+    job.extra_files = placed[1:]
+    return placed[0]
+
+
+def place_in_folder(path, folder):
+    """
+    `path` itself if it's inside `folder`, else a hardlink (a copy
+    where the drive can't link) under the same name in `folder`.
+    """
+    folder = os.path.abspath(folder)
+    try:
+        if os.path.commonpath([os.path.abspath(path), folder]) == folder:
+            return path
+    except ValueError:
+        pass   # different drives (Windows)
+
+    dest = os.path.join(folder, os.path.basename(path))
+    if not os.path.exists(dest):
+        try:
+            os.link(path, dest)
+        except OSError:
+            tmp = dest + ".part"
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, dest)
+    return dest
+
+
+def output_store(folder):
+    """
+    The content store for an output folder, opened once per process:
+    the nearest existing one in or above the folder (a mirrored folder
+    batch shares the one at its root), else a new one in the folder.
+    """
+    folder = os.path.abspath(folder)
+
+    with output_stores_lock:
+        if folder not in output_stores:
+            root = parent = folder
+            while not os.path.isdir(os.path.join(parent, STORE_DIR_NAME)):
+                if os.path.dirname(parent) == parent:
+                    break
+                parent = os.path.dirname(parent)
+            else:
+                root = parent
+
+            opened = {store.folder: store for store in output_stores.values()}
+            output_stores[folder] = opened.get(root) or OutputStore(root)
+        return output_stores[folder]
+
+
+def store_outputs(job):
+    """
+    Folds the job's finished files into the output folder's store; a
+    file whose audio is already there becomes a hardlink to it.
+    """
+    store = output_store(job.output_folder)
+    video_id = extract_video_id(job.url)
+
+    for path in [job.output_file] + job.extra_files:
+        if not path or not os.path.exists(path):
+            continue
+
+        try:
+            _, duplicate, link_error = store.add(path, video_id)
+        except (OSError, sqlite3.Error) as e:
+            job.log(f"⚠ Could not add to the output store: {e}")
+            continue
+
+        if link_error:
+            job.log(f"⚠ Indexed but not hardlinked, kept as its own file: {path} ({link_error})")
+        elif duplicate and store.links:
+            job.log(f"♻ Same audio as {os.path.basename(duplicate)}, stored once: {path}")
+        elif duplicate:
+            job.log(f"♻ Same audio as {os.path.basename(duplicate)} (no hardlinks on this drive, kept both)")
+
+
+def archive_output(job):
+    video_id = extract_video_id(job.url)
+    if video_id and job.output_file:
+        download_archive.add(
+            video_id, job.output_format, encode_params(job.output_format), job.output_file
+        )
+
+    # Extras count as downloaded for later single-format jobs too
+    if video_id and job.plan:
+        for path, extra in zip(job.extra_files, job.plan.get("extras", ())):
+            download_archive.add(
+                video_id, extra["format"], encode_params(extra["format"], extra["bitrate"]), path
+            )
+
+
+def export_metrics(json_path=METRICS_JSON_PATH, prom_path=METRICS_PROM_PATH):
+    """
+    Keeps a JSON file and a Prometheus textfile of per-stage timings
+    (totals, p50, p95) up to date as jobs finish. Call flush() on the
+    returned exporter to write right away.
+    """
+    return MetricsExporter(events.subscribe(kinds=(JobDone,)), json_path, prom_path)
+
+
+def run_job(job):
+    """
+    Runs every stage of `job` on the calling thread.
+    """
+    stage = "extract"
+    while stage:
+        stage = run_stage(stage, job)
+
+
+# ================================================================
+#  STAGE POOL
+# ================================================================
+class StagePool:
+    """
+    One pipeline stage: an inbox drained by its own pool of threads.
+    The pool size can be changed while jobs are running. With a
+    `capacity`, handing a job in blocks while the inbox is full.
+    """
+
+    def __init__(self, name, workers, forward, capacity=0):
+        self.name = name
+        self.forward = forward   # called with (job, next_stage) after each run
+        self.inbox = Queue(capacity)
+        self.lock = threading.Lock()
+        self.workers = 0
+        self.alive = 0
+        self.set_workers(workers)
+
+    def set_workers(self, workers):
+        workers = max(1, int(workers))
+
+        with self.lock:
+            self.workers = workers
+            missing = workers - self.alive
+            self.alive += max(0, missing)
+
+        # Growing starts threads now; shrinking lets surplus threads
+        # exit after their current job (see _worker_loop).
+        for _ in range(missing):
+            threading.Thread(target=self._worker_loop, daemon=True).start()
+
+    def _worker_loop(self):
+        while True:
+            with self.lock:
+                if self.alive > self.workers:
+                    self.alive -= 1
+                    release_pooled_ydl()
+                    return
+
+            try:
+                job = self.inbox.get(timeout=0.5)
+            except Empty:
+                continue
+
+            try:
+                # Handing over before task_done() keeps join() exact
+                self.forward(job, run_stage(self.name, job))
+            finally:
+                self.inbox.task_done()
+
+
+# ================================================================
+#  JOB QUEUE (STAGED PIPELINE)
+# ================================================================
+class JobQueue:
+    """
+    Jobs flow extract → download → transcode, each stage with its own
+    pool, so one job downloads while another encodes. The queues
+    between stages are bounded: a stage that falls behind stalls the
+    one before it instead of letting temp files pile up. Submitting
+    never blocks; the extract inbox is unbounded.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, extract_workers=DEFAULT_EXTRACT_WORKERS,
+                 transcode_workers=DEFAULT_TRANSCODE_WORKERS):
+        self.jobs = {}               # id → job, in submit order
+        self.finished = deque()      # ids of the finished jobs still kept, oldest first
+        self.dropped = {}            # status → finished jobs no longer kept
+        self.up_to_date = 0   # local files a folder scan found nothing to do for
+        self.lock = threading.Lock()
+
+        self.stages = {
+            "extract": StagePool("extract", extract_workers, self._forward),
+            "download": StagePool("download", workers, self._forward, STAGE_QUEUE_SIZE),
+            "transcode": StagePool("transcode", transcode_workers, self._forward, STAGE_QUEUE_SIZE),
+        }
+
+    def set_workers(self, workers, stage="download"):
+        self.stages[stage].set_workers(workers)
+
+    def _forward(self, job, next_stage):
+        if next_stage:
+            self.stages[next_stage].inbox.put(job)   # blocks while that stage is full
+        else:
+            self._retire(job)
+
+    def _retire(self, job):
+        # A daemon runs for months: only the last FINISHED_JOBS_KEPT
+        # finished jobs stay listed, the rest live on in counts()
+        with self.lock:
+            self.finished.append(job.id)
+            while len(self.finished) > FINISHED_JOBS_KEPT:
+                old = self.jobs.pop(self.finished.popleft())
+                self.dropped[old.status] = self.dropped.get(old.status, 0) + 1
+
+    def snapshot(self):
+        """
+        The jobs still kept, in submit order.
+        """
+        with self.lock:
+            return list(self.jobs.values())
+
+    def submit(self, job):
+        if job.journal_id is None:
+            job.journal_id = job_journal.add(job.url, job.options())
+
+        with self.lock:
+            self.jobs[job.id] = job
+        events.publish(JobQueued(job.id, job.url))
+        self.stages["extract"].inbox.put(job)
+        return job
+
+    def wait_for_room(self):
+        """
+        Backpressure for anything that feeds jobs in bulk (playlists,
+        folder scans, the drop folder): blocks while PLAYLIST_LOOKAHEAD
+        jobs already wait to be extracted.
+        """
+        while self.stages["extract"].inbox.qsize() >= PLAYLIST_LOOKAHEAD:
+            time.sleep(0.2)
+
+    def count_up_to_date(self, count):
+        with self.lock:
+            self.up_to_date += count
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """
+        Stops a job: a queued one never starts, a running one stops at
+        its next chunk / ffmpeg line. Returns the job (None if unknown).
+        """
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED:
+            return job
+
+        job.cancelled = True
+        if job.status == "queued":
+            set_status(job, "cancelled")   # its worker just drops it later
+        return job
+
+    def resume_unfinished(self):
+        """
+        Re-queues jobs the journal shows as queued or mid-flight when the
+        app running them stopped; each picks up from its last completed
+        stage. Jobs of another app that is still running are left alone.
+        """
+        rows = job_journal.claim_unfinished()
+
+        for row in rows:
+            job = Job(row["url"], **row["options"])
+            job.journal_id = row["id"]
+            job.stage = row["stage"]
+            job.source_file = row["source_file"]
+            job.source_size = row["source_size"]
+            job.output_file = row["output_file"]
+            job.plan = row["plan"]
+
+            self.submit(job)
+            gui_print(f"↩ Resuming job #{job.id} ({job.stage or 'not started'}): {job.url}")
+
+        return len(rows)
+
+    def submit_playlist(self, url, **job_options):
+        """
+        Expands a playlist / channel in the background and queues each
+        video as soon as it is found, so the first download starts
+        while later pages are still being listed. Returns the expander
+        thread.
+        """
+        expander = threading.Thread(
+            target=self._expand_playlist,
+            args=(url, job_options),
+            daemon=True,
+        )
+        expander.start()
+        return expander
+
+    def _expand_playlist(self, url, job_options):
+        found = 0
+
+        try:
+            for entry_url in iter_playlist_entries(url):
+                # Don't list further ahead than the pool can use
+                self.wait_for_room()
+
+                job = self.submit(Job(entry_url, **job_options))
+                found += 1
+                gui_print(f"➕ Queued job #{job.id}: {entry_url}")
+        except Exception as e:
+            gui_print(f"❌ Playlist expansion failed: {e}")
+
+        gui_print(f"📃 Playlist done: {found} videos queued from {url}")
+        events.publish(PlaylistDone(url, found))
+
+    def submit_folder(self, folder, **job_options):
+        """
+        Queues a job for every video file in a folder tree, scanning in
+        the background like submit_playlist(). Outputs mirror the tree
+        under the output folder; files whose outputs are up to date
+        are counted but not queued. Returns the scanner thread.
+        """
+        scanner = threading.Thread(
+            target=self._scan_folder,
+            args=(folder, job_options),
+            daemon=True,
+        )
+        scanner.start()
+        return scanner
+
+    def _scan_folder(self, folder, job_options):
+        folder = os.path.abspath(folder)
+        output_root = os.path.abspath(job_options.pop("output_folder"))
+        plan = scan_plan(job_options["output_format"], job_options.get("extra_outputs", ()))
+        found = up_to_date = 0
+
+        # One bad file (or a folder that vanished) must not kill the
+        # scanner thread silently: FolderScanned is always published
+        try:
+            # Opened up front so every subfolder of the mirrored tree shares it
+            if use_output_store:
+                output_store(output_root)
+
+            # Outputs written inside the scanned tree aren't sources
+            for path in iter_video_files(folder, skip=output_root):
+                try:
+                    if self._scan_file(path, folder, output_root, plan, job_options):
+                        found += 1
+                    else:
+                        up_to_date += 1
+                except Exception as e:
+                    gui_print(f"❌ Folder scan: {path}: {e}")
+                    continue
+
+                if (found + up_to_date) % FOLDER_SCAN_REPORT_EVERY == 0:
+                    gui_print(f"📂 Scanned {found + up_to_date} files: {found} queued, {up_to_date} up to date")
+        except Exception as e:
+            gui_print(f"❌ Folder scan stopped: {folder}: {e}")
+        finally:
+            gui_print(f"📂 Folder done: {found} files queued, {up_to_date} up to date, from {folder}")
+            events.publish(FolderScanned(folder, found, up_to_date))
+
+    def _scan_file(self, path, folder, output_root, plan, job_options):
+        """
+        Queues one scanned file; False if its outputs are already up to date.
+        """
+        relative = os.path.relpath(os.path.dirname(path), folder)
+        output_folder = os.path.normpath(os.path.join(output_root, relative))
+
+        # Up-to-date files never become jobs: no journal row, no queue slot
+        try:
+            current = job_options.get("skip_existing", True) and outputs_current(path, output_folder, plan)
+        except OSError:
+            current = False
+
+        if current:
+            self.count_up_to_date(1)
+            return False
+
+        # Don't scan further ahead than the pools can use
+        self.wait_for_room()
+
+        self.submit(Job(path, output_folder=output_folder, **job_options))
+        return True
+
+    def counts(self):
+        with self.lock:
+            jobs = list(self.jobs.values())
+            dropped = dict(self.dropped)
+
+        counts = {"queued": 0, "running": 0, "done": 0, "skipped": 0, "failed": 0, "cancelled": 0}
+        for status, count in dropped.items():
+            counts[status] += count
+        for job in jobs:
+            counts[job.status] += 1
+        counts["up_to_date"] = self.up_to_date
+        return counts
+
+    def join(self):
+        # Every job enters at extract and moves on before task_done()
+        for stage in self.stages.values():
+            stage.inbox.join()
@@ -0,0 +1,235 @@
+﻿import re
+import time
+import threading
+from collections import deque
+
+# ================================================================
+#  EVENT DEFAULTS
+# ================================================================
+# Events a subscriber may fall behind by before lossy ones get dropped
+DEFAULT_BACKLOG = 10000
+
+LEVELS = ("debug", "info", "warning", "error")
+
+_job_prefix = re.compile(r"^\[#\d+\]\s*")
+
+
+def message_level(msg):
+    """
+    Guesses the level of a log line from the markers the engine and
+    yt-dlp put in it.
+    """
+    text = _job_prefix.sub("", msg)
+
+    if text.startswith("ERROR:") or text.startswith("❌"):
+        return "error"
+    if text.startswith("WARNING:") or text.startswith("⚠"):
+        return "warning"
+    if text.startswith("[debug]"):
+        return "debug"
+    return "info"
+
+
+# ================================================================
+#  EVENT TYPES
+# ================================================================
+class Event:
+    """
+    Something that happened, optionally to one job. Lossy events (log
+    lines, progress) may be dropped for a subscriber that falls too
+    far behind; the others never are.
+    """
+
+    lossy = False
+
+    def __init__(self, job_id=None):
+        self.job_id = job_id
+        self.time = time.time()
+
+    def __repr__(self):
+        fields = ", ".join(f"{k}={v!r}" for k, v in vars(self).items() if k != "time")
+        return f"{type(self).__name__}({fields})"
+
+
+class LogLine(Event):
+    lossy = True
+
+    def __init__(self, message, job_id=None, level=None):
+        super().__init__(job_id)
+        self.message = str(message).rstrip()
+        self.level = level or message_level(self.message)
+
+    def __str__(self):
+        return f"[#{self.job_id}] {self.message}" if self.job_id else self.message
+
+
+class JobQueued(Event):
+    def __init__(self, job_id, url):
+        super().__init__(job_id)
+        self.url = url
+
+
+class JobStarted(Event):
+    pass
+
+
+class StageChanged(Event):
+    """
+    A job moved into a pipeline stage (extract / download / transcode).
+    """
+
+    def __init__(self, job_id, stage):
+        super().__init__(job_id)
+        self.stage = stage
+
+
+class Progress(Event):
+    """
+    One job's entry from a progress snapshot (see Job.describe()).
+    """
+
+    lossy = True
+
+    def __init__(self, job_id, state):
+        super().__init__(job_id)
+        self.state = state
+
+
+class OutputProduced(Event):
+    def __init__(self, job_id, path):
+        super().__init__(job_id)
+        self.path = path
+
+
+class JobFailed(Event):
+    def __init__(self, job_id, error):
+        super().__init__(job_id)
+        self.error = error
+
+
+class JobDone(Event):
+    """
+    Last event of every job, whatever it ended as
+    (done / skipped / failed / cancelled), with its stage timings.
+    """
+
+    def __init__(self, job_id, status, output_file=None, timings=None):
+        super().__init__(job_id)
+        self.status = status
+        self.output_file = output_file
+        self.timings = timings or {}
+
+
+class PlaylistDone(Event):
+    def __init__(self, url, found):
+        super().__init__()
+        self.url = url
+        self.found = found
+
+
+class FolderScanned(Event):
+    def __init__(self, folder, found, up_to_date):
+        super().__init__()
+        self.folder = folder
+        self.found = found
+        self.up_to_date = up_to_date
+
+
+# ================================================================
+#  SUBSCRIPTION
+# ================================================================
+class Subscription:
+    """
+    A subscriber's own backlog of events. Publishing never waits on
+    it: past `maxsize`, the oldest lossy event is dropped instead.
+    """
+
+    def __init__(self, kinds=None, maxsize=DEFAULT_BACKLOG):
+        self.kinds = tuple(kinds) if kinds else None
+        self.maxsize = maxsize
+        self.events = deque()
+        self.cond = threading.Condition()
+        self.dropped = 0
+
+    def offer(self, event):
+        if self.kinds and not isinstance(event, self.kinds):
+            return
+
+        with self.cond:
+            self.events.append(event)
+            if len(self.events) > self.maxsize:
+                self._drop_lossy()
+            self.cond.notify()
+
+    def _drop_lossy(self):
+        for i, event in enumerate(self.events):
+            if event.lossy:
+                del self.events[i]
+                self.dropped += 1
+                return
+
+    def get(self, timeout=None):
+        """
+        Next event, or None if none arrived within `timeout`.
+        """
+        with self.cond:
+            if not self.events:
+                self.cond.wait(timeout)
+            return self.events.popleft() if self.events else None
+
+    def drain(self):
+        with self.cond:
+            events = list(self.events)
+            self.events.clear()
+        return events
+
+    def empty(self):
+        return not self.events
+
+
+# ================================================================
+#  EVENT BUS
+# ================================================================
+class EventBus:
+    """
+    Fans every published event out to all subscriptions. Consumers
+    pull from their Subscription (GUI, CLI) or get a thread that
+    calls them back (listen()).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = []
+
+    def subscribe(self, kinds=None, maxsize=DEFAULT_BACKLOG):
+        subscription = Subscription(kinds, maxsize)
+        with self.lock:
+            self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            if subscription in self.subscriptions:
+                self.subscriptions.remove(subscription)
+
+    def listen(self, callback, kinds=None, maxsize=DEFAULT_BACKLOG):
+        """
+        Calls `callback(event)` for every event on a thread of its own.
+        """
+        subscription = self.subscribe(kinds, maxsize)
+
+        def pump():
+            while True:
+                event = subscription.get()
+                if event is not None:
+                    callback(event)
+
+        threading.Thread(target=pump, daemon=True).start()
+        return subscription
+
+    def publish(self, event):
+        with self.lock:
+            subscriptions = list(self.subscriptions)
+
+        for subscription in subscriptions:
+            subscription.offer(event)
@@ -0,0 +1,253 @@
+﻿# ================================================================
+#  OUTPUT TARGETS
+# ================================================================
+# codecs:  source audio codecs that can go into the target without decoding
+# encode:  ffmpeg arguments used when nothing compatible is available
+TARGETS = {
+    "mp3": {
+        "ext": "mp3",
+        "codecs": ("mp3",),
+        "encode": ["-acodec", "libmp3lame", "-ab", "192k"],
+    },
+    "webm": {
+        "ext": "webm",
+        "codecs": ("opus", "vorbis"),
+        "encode": ["-acodec", "libopus", "-ab", "160k"],
+    },
+    "opus": {
+        "ext": "opus",
+        "codecs": ("opus",),
+        "encode": ["-acodec", "libopus", "-ab", "160k"],
+    },
+    "ogg": {
+        "ext": "ogg",
+        "codecs": ("opus", "vorbis"),
+        "encode": ["-acodec", "libopus", "-ab", "160k"],
+    },
+    "m4a": {
+        "ext": "m4a",
+        "codecs": ("mp4a", "aac"),
+        "encode": ["-acodec", "aac", "-ab", "192k"],
+    },
+    # Keeps whatever the source carries in its own container (see
+    # target_for()); anything else becomes AAC in .m4a
+    "auto": {
+        "ext": "m4a",
+        "codecs": ("mp4a", "aac", "mp3", "opus", "vorbis"),
+        "encode": ["-acodec", "aac", "-ab", "192k"],
+    },
+}
+
+# "auto": source codec → the target that takes it without decoding
+AUTO_TARGETS = {"mp4a": "m4a", "aac": "m4a", "mp3": "mp3", "opus": "opus", "vorbis": "ogg"}
+
+# save:   the source file already is the output, no ffmpeg at all
+# copy:   ffmpeg remuxes the audio stream into another container (-acodec copy)
+# encode: ffmpeg decodes and re-encodes
+MODE_RANK = {"save": 2, "copy": 1, "encode": 0}
+
+
+def parse_output(spec):
+    """
+    "mp3" → ("mp3", None), "mp3:320k" → ("mp3", "320k").
+    Raises ValueError for an unknown format.
+    """
+    output_format, _, bitrate = spec.strip().lower().partition(":")
+    if output_format not in TARGETS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    return output_format, bitrate or None
+
+
+def target_for(output_format, fmt=None):
+    """
+    The target an output format resolves to for the source format `fmt`:
+    "auto" picks the one the source codec fits as-is.
+    """
+    if output_format == "auto" and fmt is not None:
+        return TARGETS[AUTO_TARGETS.get(_codec_family(fmt.get("acodec")), "auto")]
+    return TARGETS[output_format]
+
+
+def encode_args(output_format, bitrate=None):
+    """
+    The target's encode arguments, with its bitrate swapped for `bitrate`.
+    """
+    args = list(TARGETS[output_format]["encode"])
+    if bitrate:
+        args[args.index("-ab") + 1] = bitrate
+    return args
+
+
+def encode_params(output_format, bitrate=None):
+    """
+    Describes the encode settings of an output format (archive key).
+    """
+    target = TARGETS[output_format]
+    return "|".join(["copy:" + "+".join(target["codecs"])] + encode_args(output_format, bitrate))
+
+
+def extra_plans(source, extra_outputs):
+    """
+    Plans for the extra outputs made in the same ffmpeg run as the main
+    one, from the chosen `source` format (None if unknown): a remux when
+    the codec fits and no bitrate was asked for, an encode otherwise.
+    """
+    extras = []
+    for spec in extra_outputs or ():
+        output_format, bitrate = parse_output(spec)
+        target = target_for(output_format, source)
+
+        fits = source is not None and _codec_family(source.get("acodec")) in target["codecs"]
+        mode = "copy" if fits and not bitrate else "encode"
+
+        extras.append({
+            "spec": spec,
+            "format": output_format,
+            "bitrate": bitrate,
+            "mode": mode,
+            "ext": target["ext"],
+            "ffmpeg_args": ["-acodec", "copy"] if mode == "copy" else encode_args(output_format, bitrate),
+        })
+    return extras
+
+
+def encode_plan(output_format, reason, extra_outputs=()):
+    """
+    Plan that lets yt-dlp pick the best audio and always re-encodes.
+    """
+    target = TARGETS[output_format]
+    return {
+        "format_id": "bestaudio/best",
+        "mode": "encode",
+        "reason": reason,
+        "ext": target["ext"],
+        "ffmpeg_args": target["encode"],
+        "extras": extra_plans(None, extra_outputs),
+    }
+
+
+# ================================================================
+#  FORMAT NEGOTIATION
+# ================================================================
+def _codec_family(acodec):
+    # "mp4a.40.2" → "mp4a", "opus" → "opus"
+    return (acodec or "").split(".")[0].lower()
+
+
+def _mode_for(fmt, target):
+    if _codec_family(fmt.get("acodec")) not in target["codecs"]:
+        return "encode"
+    if fmt.get("ext") == target["ext"]:
+        return "save"
+    return "copy"
+
+
+def _describe(fmt):
+    abr = fmt.get("abr")
+    return (
+        f"{fmt.get('format_id')} ({_codec_family(fmt.get('acodec')) or 'unknown codec'} "
+        f"in .{fmt.get('ext')}, {f'{abr:.0f} kbps' if abr else 'unknown bitrate'})"
+    )
+
+
+def negotiate_format(info, output_format, extra_outputs=()):
+    """
+    Scores every audio format in the extracted info against the
+    requested output and returns a plan:
+
+        {"format_id", "mode", "reason", "ext", "ffmpeg_args", "extras"}
+
+    As in yt-dlp's own bestaudio, the language it prefers (the original
+    audio track, not a dub) comes first and formats marked damaged
+    last. After that, formats that can be kept as-is
+    beat ones that can be remuxed, which beat ones that must be
+    re-encoded. Ties go to the format the extra outputs (see
+    extra_plans()) can be remuxed from, then to yt-dlp's quality
+    (which ranks DRC variants lower), then to the higher bitrate.
+    """
+    extra_targets = [
+        TARGETS[output_format] for output_format, bitrate in map(parse_output, extra_outputs or ())
+        if not bitrate   # a set bitrate is always an encode
+    ]
+
+    formats = [
+        f for f in info.get("formats") or []
+        if f.get("acodec") not in (None, "none") and f.get("format_id")
+    ]
+    audio_only = [f for f in formats if f.get("vcodec") in (None, "none")]
+    candidates = audio_only or formats
+
+    if not candidates:
+        # No format list (e.g. a direct file) → let yt-dlp pick, then encode
+        return encode_plan(output_format, "no format list to negotiate with", extra_outputs)
+
+    # yt-dlp's defaults for formats that don't say
+    def ranked(fmt, field):
+        value = fmt.get(field)
+        return -1 if value is None else value
+
+    def score(fmt):
+        return (
+            ranked(fmt, "language_preference"),
+            fmt.get("preference") or 0,   # -10 = damaged
+            MODE_RANK[_mode_for(fmt, target_for(output_format, fmt))],
+            sum(_codec_family(fmt.get("acodec")) in t["codecs"] for t in extra_targets),
+            ranked(fmt, "quality"),
+            fmt.get("abr") or fmt.get("tbr") or 0,
+            fmt.get("protocol") in ("http", "https"),   # can be range-fetched
+        )
+
+    best = max(candidates, key=score)
+    target = target_for(output_format, best)
+    mode = _mode_for(best, target)
+
+    if mode == "save":
+        reason = f"{_describe(best)} already is .{target['ext']}"
+        ffmpeg_args = []
+    elif mode == "copy":
+        reason = f"{_describe(best)} remuxed into .{target['ext']} without re-encoding"
+        ffmpeg_args = ["-acodec", "copy"]
+    else:
+        reason = f"no {'/'.join(target['codecs'])} source, encoding from {_describe(best)}"
+        ffmpeg_args = target["encode"]
+
+    return {
+        "format_id": best["format_id"],
+        "mode": mode,
+        "reason": reason,
+        "ext": target["ext"],
+        "ffmpeg_args": ffmpeg_args,
+        "extras": extra_plans(best, extra_outputs),
+    }
+
+
+def local_plan(info, output_format, extra_outputs=()):
+    """
+    Plan for a local file probed into `info` (see probe_media()). The
+    source is never kept as-is, so a fitting codec means a stream copy
+    out of the video container (minutes of audio in a fraction of a
+    second); only other codecs are decoded and encoded.
+    """
+    if not info:
+        return encode_plan(output_format, "local file, audio codec unknown", extra_outputs)
+
+    plan = negotiate_format(info, output_format, extra_outputs)
+    if plan["mode"] == "save":
+        plan.update(
+            mode="copy",
+            reason=f"{_describe(info['formats'][0])} copied into .{plan['ext']} without decoding",
+            ffmpeg_args=["-acodec", "copy"],
+        )
+    return plan
+
+
+def scan_plan(output_format, extra_outputs=()):
+    """
+    Plan a folder scan can judge a local file's outputs by without
+    probing it, or None when their names depend on the source codec
+    ("auto"): only prepare_local_source() can tell those.
+    """
+    formats = [output_format] + [parse_output(spec)[0] for spec in extra_outputs or ()]
+    if "auto" in formats:
+        return None
+    return encode_plan(output_format, "local video file", extra_outputs)
@@ -0,0 +1,180 @@
+﻿import os
+import sys
+import json
+import time
+import sqlite3
+import threading
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+# ================================================================
+#  SCHEMA
+# ================================================================
+# status: queued / running / done / skipped / failed
+# stage:  extracted → downloaded → converted → cleaned
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    url         TEXT NOT NULL,
+    options     TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    stage       TEXT,
+    source_file TEXT,
+    source_size INTEGER,
+    output_file TEXT,
+    plan        TEXT,
+    owner       TEXT,
+    error       TEXT,
+    updated     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status);
+"""
+
+UNFINISHED = ("queued", "running")
+
+# Columns stored as JSON text
+JSON_COLUMNS = ("options", "plan")
+
+# Every running app holds an exclusive lock on its own file in here
+# (named after its pid and start time); a job whose owner's file can be
+# locked belongs to an app that is gone
+OWNERS_DIR_NAME = "owners"
+
+
+def try_lock(f):
+    """
+    Takes an exclusive lock on open file `f` without waiting; False if
+    another process (or another handle) holds it.
+    """
+    try:
+        if sys.platform == "win32":
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+# ================================================================
+#  JOB JOURNAL (SQLITE)
+# ================================================================
+class JobJournal:
+    """
+    Durable record of every job and the last stage it completed, so a
+    crashed or closed app can pick unfinished work back up on restart.
+    One connection shared by all workers, serialized by a lock.
+
+    The GUI and the CLI share the journal, so each job records the app
+    that owns it and only jobs whose owner is gone get resumed.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.owners_dir = os.path.join(os.path.dirname(path), OWNERS_DIR_NAME)
+        os.makedirs(self.owners_dir, exist_ok=True)
+        for owner in os.listdir(self.owners_dir):
+            self.owner_alive(owner)   # clears out apps that are gone
+
+        self.owner = f"{os.getpid()}-{int(time.time())}"
+        # Held (open and locked) until this process exits
+        self.owner_file = open(os.path.join(self.owners_dir, self.owner), "wb")
+        try_lock(self.owner_file)
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+
+        with self.lock:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.executescript(SCHEMA)
+            self.db.commit()
+
+    def add(self, url, options):
+        with self.lock:
+            cur = self.db.execute(
+                "INSERT INTO jobs (url, options, status, owner, updated) VALUES (?, ?, 'queued', ?, ?)",
+                (url, json.dumps(options), self.owner, time.time()),
+            )
+            self.db.commit()
+            return cur.lastrowid
+
+    def save(self, journal_id, **fields):
+        """
+        Updates the given columns (status, stage, source_file, …).
+        """
+        for name in JSON_COLUMNS:
+            if name in fields and fields[name] is not None:
+                fields[name] = json.dumps(fields[name])
+
+        fields["updated"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+
+        with self.lock:
+            self.db.execute(
+                f"UPDATE jobs SET {columns} WHERE id = ?",
+                (*fields.values(), journal_id),
+            )
+            self.db.commit()
+
+    def owner_alive(self, owner):
+        """
+        Whether the app that wrote `owner` into the journal still runs.
+        A gone app's lock file is removed on the way.
+        """
+        path = os.path.join(self.owners_dir, owner)
+        try:
+            f = open(path, "r+b")
+        except FileNotFoundError:
+            return False
+
+        with f:
+            if not try_lock(f):
+                return True
+
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return False
+
+    def claim_unfinished(self):
+        """
+        Jobs that were queued or mid-flight when the app running them
+        stopped. They are taken over by this app, so a second instance
+        started meanwhile doesn't run them twice.
+        """
+        with self.lock:
+            # IMMEDIATE: two apps starting at once can't claim the same job
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = [
+                    row for row in self.db.execute(
+                        "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY id", UNFINISHED
+                    ).fetchall()
+                    if row["owner"] != self.owner
+                    and not (row["owner"] and self.owner_alive(row["owner"]))
+                ]
+                self.db.executemany(
+                    "UPDATE jobs SET owner = ? WHERE id = ?",
+                    [(self.owner, row["id"]) for row in rows],
+                )
+                self.db.commit()
+            except BaseException:
+                self.db.rollback()
+                raise
+
+        jobs = []
+        for row in rows:
+            job = dict(row)
+            for name in JSON_COLUMNS:
+                if job[name] is not None:
+                    job[name] = json.loads(job[name])
+            jobs.append(job)
+
+        return jobs
@@ -0,0 +1,83 @@
+﻿import os
+import re
+import json
+import time
+import tempfile
+
+# ================================================================
+#  METADATA CACHE DEFAULTS
+# ================================================================
+# YouTube stream URLs inside the info dict expire after ~6 hours,
+# so cached entries must go stale well before that.
+DEFAULT_METADATA_TTL = 3 * 60 * 60
+
+VIDEO_ID_REGEX = re.compile(r"(?:[?&]v=|youtu\.be/|/shorts/)([\w\-]{11})")
+
+
+def extract_video_id(url: str):
+    """
+    Returns the 11-character YouTube video ID in a URL, or None.
+    """
+    m = VIDEO_ID_REGEX.search(url)
+    return m.group(1) if m else None
+
+
+# ================================================================
+#  ON-DISK CACHE (ONE JSON FILE PER VIDEO ID)
+# ================================================================
+class MetadataCache:
+    """
+    Stores the extract_info() result per video ID so retries, re-runs
+    in another format and metadata lookups skip the extraction round-trip.
+    Entries older than the TTL, or that fail to parse, are dropped and
+    re-extracted by the caller.
+    """
+
+    def __init__(self, cache_dir, ttl=DEFAULT_METADATA_TTL):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, video_id):
+        return os.path.join(self.cache_dir, video_id + ".json")
+
+    def get(self, video_id):
+        path = self._path(video_id)
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+
+            if time.time() - entry["fetched"] > self.ttl:
+                self.invalidate(video_id)
+                return None
+
+            return entry["info"]
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError):
+            # Half-written or corrupt entry → refresh it
+            self.invalidate(video_id)
+            return None
+
+    def put(self, video_id, info):
+        entry = {"fetched": time.time(), "info": info}
+
+        # Write to a temp file first so readers never see a partial entry
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp, self._path(video_id))
+        except Exception:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def invalidate(self, video_id):
+        try:
+            os.remove(self._path(video_id))
+        except OSError:
+            pass
@@ -0,0 +1,206 @@
+﻿import os
+import json
+import math
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+# ================================================================
+#  METRICS DEFAULTS
+# ================================================================
+# Stages every job is timed in, in pipeline order
+STAGE_NAMES = ("extract", "download", "convert", "store", "cleanup")
+
+# Percentiles are taken over the most recent samples per stage
+MAX_SAMPLES = 1000
+
+# Seconds between two rewrites of the metrics files
+METRICS_WRITE_INTERVAL = 10.0
+
+
+# ================================================================
+#  PER-JOB TIMINGS
+# ================================================================
+def wait_child(p):
+    """
+    Waits for a subprocess and returns the CPU seconds (user + system)
+    it used. Only POSIX reports that per child; elsewhere this is 0.
+    """
+    if hasattr(os, "wait4"):
+        _, status, usage = os.wait4(p.pid, 0)
+        p.returncode = os.waitstatus_to_exitcode(status)
+        return usage.ru_utime + usage.ru_stime
+
+    p.wait()
+    return 0.0
+
+
+class JobTimings:
+    """
+    Wall-clock and CPU seconds per stage for one job. CPU covers the
+    measuring thread plus any ffmpeg it waited for (add_child_cpu).
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.child_cpu = 0.0
+
+    @contextmanager
+    def measure(self, stage):
+        wall, cpu, child = time.perf_counter(), time.thread_time(), self.child_cpu
+        try:
+            yield
+        finally:
+            entry = self.stages.setdefault(stage, {"wall": 0.0, "cpu": 0.0})
+            entry["wall"] += time.perf_counter() - wall
+            entry["cpu"] += time.thread_time() - cpu + self.child_cpu - child
+
+    def add_child_cpu(self, seconds):
+        self.child_cpu += seconds
+
+    def summary(self):
+        """
+        "extract 1.2s • convert 4.1s (cpu 15.2s) • …" for the log.
+        """
+        parts = []
+        for stage in STAGE_NAMES:
+            if stage in self.stages:
+                entry = self.stages[stage]
+                parts.append(f"{stage} {entry['wall']:.1f}s (cpu {entry['cpu']:.1f}s)")
+        return " • ".join(parts)
+
+
+# ================================================================
+#  AGGREGATES
+# ================================================================
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of `values` (0 for no values).
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class StageMetrics:
+    """
+    Totals per stage over every finished job, and p50 / p95 / max over
+    the last MAX_SAMPLES of them.
+    """
+
+    def __init__(self):
+        self.jobs = {}
+        self.count = {}
+        self.totals = {}
+        self.samples = {}
+
+    def record(self, status, timings):
+        self.jobs[status] = self.jobs.get(status, 0) + 1
+
+        for stage, entry in (timings or {}).items():
+            self.count[stage] = self.count.get(stage, 0) + 1
+            for kind in ("wall", "cpu"):
+                key = (stage, kind)
+                self.totals[key] = self.totals.get(key, 0.0) + entry[kind]
+                self.samples.setdefault(key, deque(maxlen=MAX_SAMPLES)).append(entry[kind])
+
+    def _stats(self, stage, kind):
+        samples = list(self.samples.get((stage, kind), ()))
+        return {
+            "total": round(self.totals.get((stage, kind), 0.0), 3),
+            "p50": round(percentile(samples, 0.50), 3),
+            "p95": round(percentile(samples, 0.95), 3),
+            "max": round(max(samples, default=0.0), 3),
+        }
+
+    def snapshot(self):
+        stages = [s for s in STAGE_NAMES if s in self.count] + \
+                 sorted(s for s in self.count if s not in STAGE_NAMES)
+
+        return {
+            "updated": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "jobs": dict(self.jobs),
+            "stages": {
+                stage: {
+                    "count": self.count[stage],
+                    "wall_seconds": self._stats(stage, "wall"),
+                    "cpu_seconds": self._stats(stage, "cpu"),
+                }
+                for stage in stages
+            },
+        }
+
+    def prometheus(self):
+        snapshot = self.snapshot()
+        lines = [
+            "# HELP youtubepuller_jobs_finished_total Jobs finished, by final status.",
+            "# TYPE youtubepuller_jobs_finished_total counter",
+        ]
+        for status, count in sorted(snapshot["jobs"].items()):
+            lines.append(f'youtubepuller_jobs_finished_total{{status="{status}"}} {count}')
+
+        for kind, what in (("wall", "Wall-clock"), ("cpu", "CPU")):
+            name = f"youtubepuller_stage_{kind}_seconds"
+            lines.append(f"# HELP {name} {what} seconds a job spent in each stage.")
+            lines.append(f"# TYPE {name} summary")
+
+            for stage, data in snapshot["stages"].items():
+                stats = data[f"{kind}_seconds"]
+                lines.append(f'{name}{{stage="{stage}",quantile="0.5"}} {stats["p50"]}')
+                lines.append(f'{name}{{stage="{stage}",quantile="0.95"}} {stats["p95"]}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {stats["total"]}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {data["count"]}')
+
+        return "\n".join(lines) + "\n"
+
+
+# ================================================================
+#  EXPORTER (JSON + PROMETHEUS TEXTFILE)
+# ================================================================
+def _write_atomic(path, text):
+    # The textfile collector must never see a half-written file
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+class MetricsExporter:
+    """
+    Folds the timings of finished jobs (JobDone events from
+    `subscription`) into StageMetrics and rewrites the JSON and
+    Prometheus files every `interval` seconds while anything changed.
+    """
+
+    def __init__(self, subscription, json_path=None, prom_path=None,
+                 interval=METRICS_WRITE_INTERVAL):
+        self.subscription = subscription
+        self.json_path = json_path
+        self.prom_path = prom_path
+        self.interval = interval
+        self.metrics = StageMetrics()
+        self.lock = threading.Lock()
+
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            finished = self.subscription.drain()
+            if not finished:
+                return
+
+            for event in finished:
+                self.metrics.record(event.status, event.timings)
+
+            if self.json_path:
+                _write_atomic(self.json_path, json.dumps(self.metrics.snapshot(), indent=2))
+            if self.prom_path:
+                _write_atomic(self.prom_path, self.metrics.prometheus())
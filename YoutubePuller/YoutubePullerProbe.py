@@ -0,0 +1,74 @@
+﻿import os
+import re
+import subprocess
+
+# ================================================================
+#  PROBE DEFAULTS
+# ================================================================
+# ffmpeg -i on a large file only reads the header, but a stalled
+# network share must not hang a worker
+PROBE_TIMEOUT = 60
+
+# What `ffmpeg -i` prints to stderr for each input, e.g.
+#   Duration: 01:12:03.52, start: 0.000000, bitrate: 1523 kb/s
+#   Stream #0:1[0x2](eng): Audio: aac (LC) (mp4a / 0x6134706D), 48000 Hz, stereo, fltp, 128 kb/s (default)
+_DURATION = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+_STREAM = re.compile(r"Stream #\d+:(\d+)\S*: (Audio|Video): (\w+)(.*)")
+_BITRATE = re.compile(r"(\d+) kb/s")
+_LAYOUT = re.compile(r"Hz, ([^,]+)")
+
+CHANNELS = {"mono": 1, "stereo": 2, "2.1": 3, "quad": 4, "5.0": 5, "5.1": 6, "6.1": 7, "7.1": 8}
+
+
+# ================================================================
+#  LOCAL MEDIA PROBE
+# ================================================================
+def _channels(layout):
+    layout = layout.split("(")[0].strip()
+    match = re.match(r"(\d+) channels", layout)
+    return int(match.group(1)) if match else CHANNELS.get(layout, 0)
+
+
+def probe_media(ffmpeg_path, path):
+    """
+    Reads a local file's streams from `ffmpeg -i` (the builds we ship
+    have no ffprobe). Returns an info dict shaped like yt-dlp's, with
+    the audio stream ffmpeg maps by default (most channels, then the
+    first) as its only format, or None if the file has no audio.
+    """
+    result = subprocess.run(
+        [ffmpeg_path, "-hide_banner", "-i", path],   # no output: ffmpeg exits 1 after the header
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        timeout=PROBE_TIMEOUT,
+    )
+    text = result.stderr.decode("utf-8", errors="replace")
+
+    audio, vcodec = [], "none"
+    for index, kind, codec, rest in _STREAM.findall(text):
+        if kind == "Video":
+            vcodec = codec if vcodec == "none" else vcodec
+            continue
+
+        bitrate = _BITRATE.search(rest)
+        layout = _LAYOUT.search(rest)
+        audio.append({
+            "format_id": f"0:{index}",
+            "acodec": codec,
+            "abr": float(bitrate.group(1)) if bitrate else None,
+            "channels": _channels(layout.group(1)) if layout else 0,
+        })
+
+    if not audio:
+        return None
+
+    stream = max(audio, key=lambda s: s["channels"])   # max() keeps the first on a tie
+    stream.update(vcodec=vcodec, ext=os.path.splitext(path)[1][1:].lower())
+
+    duration = _DURATION.search(text)
+    seconds = None
+    if duration:
+        hours, minutes, secs = duration.groups()
+        seconds = int(hours) * 3600 + int(minutes) * 60 + float(secs)
+
+    return {"duration": seconds, "formats": [stream]}
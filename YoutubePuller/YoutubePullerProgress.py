@@ -0,0 +1,135 @@
+﻿import time
+import threading
+
+# ================================================================
+#  PROGRESS DEFAULTS
+# ================================================================
+# Seconds between two published snapshots
+DEFAULT_PROGRESS_INTERVAL = 1.0
+
+# Weight of the newest sample in the smoothed speed (exponential average)
+SPEED_SMOOTHING = 0.3
+
+
+def format_progress(state):
+    """
+    One-line summary of a snapshot entry: "42.0% of 24.4 MB at 3.1 MB/s ETA 5s".
+    """
+    if state["total_bytes"] and state["percent"] is not None:
+        text = f"{state['percent']:.1f}% of {state['total_bytes'] / 1048576:.1f} MB"
+    else:
+        text = f"{state['downloaded_bytes'] / 1048576:.1f} MB"
+
+    if state.get("speed"):
+        text += f" at {state['speed'] / 1048576:.1f} MB/s"
+    if state.get("eta") is not None:
+        text += f" ETA {state['eta']:.0f}s"
+    return text
+
+
+# ================================================================
+#  PROGRESS AGGREGATOR
+# ================================================================
+class ProgressAggregator:
+    """
+    Keeps the latest progress of every tracked job and publishes it as
+    one snapshot every `interval` seconds, however often the bytes move.
+
+    Downloads only bump their job's byte counter; speed and ETA are
+    worked out here once per tick. A snapshot maps job ID → the job's
+    describe() dict plus "speed" (bytes/s) and "eta" (s). Subscribers
+    get every snapshot, or at most one per `every` seconds; finished
+    jobs appear in one last snapshot and are then dropped.
+    """
+
+    def __init__(self, interval=DEFAULT_PROGRESS_INTERVAL, finished=()):
+        self.lock = threading.Lock()
+        self.interval = interval
+        self.finished = finished   # statuses after which a job is dropped
+        self.jobs = {}
+        self.rates = {}            # job ID → {"bytes", "stamp", "speed", "eta"}
+        self.snapshot = {}
+        self.subscribers = []
+        self.thread = None
+
+    def set_interval(self, interval):
+        self.interval = max(0.1, float(interval))
+
+    def track(self, job):
+        with self.lock:
+            self.jobs[job.id] = job
+
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+
+    def subscribe(self, callback, every=None):
+        with self.lock:
+            self.subscribers.append({"callback": callback, "every": every, "last": 0.0})
+
+    def latest(self):
+        """
+        The most recently published snapshot.
+        """
+        return self.snapshot
+
+    def rate(self, job_id):
+        """
+        (speed, eta) of a job as of the last tick.
+        """
+        rate = self.rates.get(job_id)
+        return (rate["speed"], rate["eta"]) if rate else (None, None)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.publish()
+
+    def _measure(self, job, now):
+        downloaded = job.downloaded_bytes
+        rate = self.rates.get(job.id)
+
+        # New job, or the download restarted from zero
+        if rate is None or downloaded < rate["bytes"]:
+            rate = self.rates[job.id] = {"bytes": downloaded, "stamp": now, "speed": None, "eta": None}
+            return
+
+        elapsed = now - rate["stamp"]
+        if elapsed > 0:
+            sample = (downloaded - rate["bytes"]) / elapsed
+            speed = rate["speed"]
+            rate["speed"] = sample if speed is None else speed + SPEED_SMOOTHING * (sample - speed)
+        rate["bytes"], rate["stamp"] = downloaded, now
+
+        if job.step != "download":
+            rate["speed"] = rate["eta"] = None
+        elif rate["speed"] and job.total_bytes:
+            rate["eta"] = max(0, job.total_bytes - downloaded) / rate["speed"]
+        else:
+            rate["eta"] = None
+
+    def publish(self):
+        now = time.monotonic()
+
+        with self.lock:
+            jobs = list(self.jobs.values())
+            subscribers = list(self.subscribers)
+
+        snapshot = {}
+        for job in jobs:
+            self._measure(job, now)
+            speed, eta = self.rate(job.id)
+            snapshot[job.id] = dict(job.describe(), speed=speed, eta=eta)
+
+            if job.status in self.finished:
+                with self.lock:
+                    self.jobs.pop(job.id, None)
+                self.rates.pop(job.id, None)
+
+        self.snapshot = snapshot
+
+        for sub in subscribers:
+            if sub["every"] and now - sub["last"] < sub["every"]:
+                continue
+            sub["last"] = now
+            sub["callback"](snapshot)
@@ -0,0 +1,191 @@
+﻿import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from yt_dlp.networking import Request
+from yt_dlp.networking.exceptions import HTTPError, RequestError
+
+# ================================================================
+#  RANGE DEFAULTS
+# ================================================================
+# Sequential reads use ranged chunks of this size (same trick yt-dlp
+# uses to dodge YouTube's per-request throttling)
+DEFAULT_CHUNK_SIZE = 10 * 1024 * 1024
+MIN_PARALLEL_CHUNK_SIZE = 1024 * 1024
+READ_SIZE = 64 * 1024
+RANGE_RETRIES = 3
+
+
+# ================================================================
+#  SINGLE RANGE REQUESTS
+# ================================================================
+def can_fetch_ranges(info):
+    """
+    Only a single progressive HTTP stream can be fetched by byte range;
+    DASH / HLS fragments and merged video+audio formats can't.
+    """
+    return (
+        "requested_formats" not in info
+        and info.get("protocol") in ("http", "https")
+        and bool(info.get("url"))
+    )
+
+
+def open_range(ydl, info, start, end):
+    headers = dict(info.get("http_headers") or {})
+    headers["Range"] = f"bytes={start}-{end}"
+    return ydl.urlopen(Request(info["url"], headers=headers))
+
+
+def probe_size(ydl, info):
+    """
+    Returns the total size of the stream in bytes (None if the server
+    won't say). Also proves the stream URL is still alive.
+    """
+    response = open_range(ydl, info, 0, 0)
+    response.read()
+
+    content_range = response.headers.get("Content-Range") or ""
+    m = re.search(r"/(\d+)$", content_range)
+    if m:
+        return int(m.group(1))
+
+    return info.get("filesize")
+
+
+def read_range(ydl, info, start, end, throttle=None):
+    """
+    Reads one byte range completely. A failed or short read is requested
+    again from the byte it stopped at, so every n bytes passed to
+    `throttle(n)` (bandwidth limiting, progress) end up in the result.
+    """
+    expected = end - start + 1
+    pieces = []
+    got = 0
+
+    for _ in range(RANGE_RETRIES):
+        try:
+            response = open_range(ydl, info, start + got, end)
+            while got < expected:
+                data = response.read(min(READ_SIZE, expected - got))
+                if not data:
+                    break
+                if throttle:
+                    throttle(len(data))
+                pieces.append(data)
+                got += len(data)
+        except (RequestError, OSError) as e:
+            problem = e
+        else:
+            problem = f"got {got} of {expected} bytes"
+
+        if got == expected:
+            return b"".join(pieces)
+
+    raise IOError(f"Range {start}-{end} failed after {RANGE_RETRIES} tries: {problem}")
+
+
+# ================================================================
+#  SEQUENTIAL / PARALLEL BYTE STREAMS
+# ================================================================
+def iter_ranges(ydl, info, total=None, start=0, chunk_size=DEFAULT_CHUNK_SIZE,
+                throttle=None):
+    """
+    Yields the stream from byte `start` over one connection, piece by
+    piece as bytes arrive. A failed or (with a known size) short chunk
+    is requested again from the byte it stopped at, up to
+    RANGE_RETRIES times per chunk.
+    """
+    tries = 0
+
+    while total is None or start < total:
+        end = start + chunk_size - 1
+        if total is not None:
+            end = min(end, total - 1)
+
+        got = 0
+        try:
+            response = open_range(ydl, info, start, end)
+            while True:
+                data = response.read(READ_SIZE)
+                if not data:
+                    break
+                if throttle:
+                    throttle(len(data))
+                got += len(data)
+                yield data
+        except HTTPError as e:
+            if e.status == 416 and total is None and not got:
+                return   # size was an exact multiple of the chunk
+            problem = e
+        except (RequestError, OSError) as e:
+            problem = e
+        else:
+            if got == end - start + 1:
+                start += got
+                tries = 0
+                continue
+            if total is None:
+                start += got
+                break   # short chunk → end of stream
+            problem = f"got {got} of {end - start + 1} bytes"
+
+        # Resume right after the bytes already passed on
+        start += got
+        tries += 1
+        if tries >= RANGE_RETRIES:
+            raise IOError(f"Range from {start} failed after {RANGE_RETRIES} tries: {problem}")
+
+    if total is not None and start != total:
+        raise IOError(f"Stream ended at {start} of {total} bytes")
+
+
+def iter_ranges_parallel(ydl, info, total, connections, start=0,
+                         chunk_size=DEFAULT_CHUNK_SIZE, throttle=None):
+    """
+    Splits the stream from byte `start` into byte ranges fetched over
+    `connections` connections at once and yields them back in order.
+    At most two ranges per connection are held in memory.
+    """
+    # Small audio files still get split across every connection
+    per_connection = -(-(total - start) // connections)
+    chunk_size = max(MIN_PARALLEL_CHUNK_SIZE, min(chunk_size, per_connection))
+
+    ranges = iter(
+        (offset, min(offset + chunk_size, total) - 1)
+        for offset in range(start, total, chunk_size)
+    )
+
+    received = start
+
+    with ThreadPoolExecutor(max_workers=connections) as pool:
+        pending = deque()
+
+        for first, last in ranges:
+            pending.append(pool.submit(read_range, ydl, info, first, last, throttle))
+            if len(pending) >= connections * 2:
+                break
+
+        while pending:
+            data = pending.popleft().result()
+
+            nxt = next(ranges, None)
+            if nxt:
+                pending.append(pool.submit(read_range, ydl, info, *nxt, throttle))
+
+            received += len(data)
+            yield data
+
+    if received != total:
+        raise IOError(f"Reassembled {received} of {total} bytes")
+
+
+def iter_source(ydl, info, total, connections=1, start=0, throttle=None):
+    """
+    Ordered byte stream of the selected format from byte `start`, over
+    several connections when asked to and the size is known.
+    """
+    if connections > 1 and total:
+        return iter_ranges_parallel(ydl, info, total, connections, start, throttle=throttle)
+
+    return iter_ranges(ydl, info, total, start, throttle=throttle)
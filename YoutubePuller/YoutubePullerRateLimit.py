@@ -0,0 +1,68 @@
+﻿import time
+import threading
+
+
+# ================================================================
+#  TOKEN BUCKET (PROCESS-WIDE BANDWIDTH GOVERNOR)
+# ================================================================
+class TokenBucket:
+    """
+    Caps the combined throughput of every concurrent download.
+
+    Downloads call consume() with the number of bytes they just read;
+    tokens refill at `rate` bytes/second up to one second of burst.
+    A draw may overdraw the bucket, and the next caller waits until the
+    debt is repaid, so chunk size never matters.
+    Interactive draws are served first: bulk callers hold back while an
+    interactive caller is waiting. A rate of 0 means unlimited. The
+    rate can be changed at any time.
+    """
+
+    def __init__(self, rate=0, burst_seconds=1.0):
+        self.cond = threading.Condition()
+        self.burst_seconds = burst_seconds
+        self.rate = 0
+        self.capacity = 0
+        self.tokens = 0.0
+        self.stamp = time.monotonic()
+        self.interactive_waiting = 0
+        self.set_rate(rate)
+
+    def set_rate(self, rate):
+        with self.cond:
+            self._refill()
+            self.rate = max(0, rate)
+            self.capacity = self.rate * self.burst_seconds
+            self.tokens = min(self.tokens, self.capacity)
+            self.cond.notify_all()
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.rate:
+            self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def consume(self, amount, interactive=False):
+        with self.cond:
+            if interactive:
+                self.interactive_waiting += 1
+
+            try:
+                while True:
+                    if not self.rate:
+                        return
+
+                    self._refill()
+
+                    may_draw = interactive or not self.interactive_waiting
+                    if may_draw and self.tokens > 0:
+                        self.tokens -= amount
+                        return
+
+                    # Sleep until the debt is repaid (or the rate changes)
+                    wait = -self.tokens / self.rate
+                    self.cond.wait(min(max(wait, 0.01), 0.5))
+            finally:
+                if interactive:
+                    self.interactive_waiting -= 1
+                    self.cond.notify_all()
@@ -0,0 +1,199 @@
+﻿import os
+import time
+import errno
+import sqlite3
+import hashlib
+import threading
+
+# ================================================================
+#  STORE DEFAULTS
+# ================================================================
+# Lives inside the output folder so objects and titles share a filesystem
+STORE_DIR_NAME = ".youtubepuller-store"
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Errors meaning the drive can't hardlink at all, as opposed to one file
+# that can't be replaced right now (open in a player on Windows)
+NO_LINK_ERRNOS = {errno.EXDEV, errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP}
+NO_LINK_WINERRORS = {1}   # ERROR_INVALID_FUNCTION: FAT, some network shares
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    path     TEXT PRIMARY KEY,
+    digest   TEXT NOT NULL,
+    size     INTEGER NOT NULL,
+    video_id TEXT,
+    added    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_digest ON entries(digest);
+"""
+
+
+def file_digest(path):
+    """
+    SHA-256 of a file's bytes, as hex.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# ================================================================
+#  CONTENT-ADDRESSED OUTPUT STORE
+# ================================================================
+class OutputStore:
+    """
+    Keeps one physical copy per distinct audio file in an output folder.
+
+    Every finished file is hashed. The first file with a given hash is
+    hardlinked as the object (objects/ab/abcd….mp3); later files with
+    the same content are replaced by hardlinks to it, so re-uploads
+    and mirrors under other titles cost no extra disk. The index
+    answers "do we already have this?" by hash, and manifest.tsv lists
+    every title with its hash for backup tools. The manifest only gets
+    lines appended (a title's last line wins); prune() rewrites it.
+
+    Where hardlinks aren't supported (FAT, some network shares) files
+    stay separate and are only indexed.
+    """
+
+    def __init__(self, folder):
+        self.folder = os.path.abspath(folder)
+        self.root = os.path.join(self.folder, STORE_DIR_NAME)
+        self.objects = os.path.join(self.root, "objects")
+        self.manifest_path = os.path.join(self.root, "manifest.tsv")
+        self.links = True   # off after the first failed hardlink
+        os.makedirs(self.objects, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(self.root, "index.sqlite3"), check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+
+        with self.lock:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.executescript(SCHEMA)
+            self.db.commit()
+            if not os.path.exists(self.manifest_path):
+                self._write_manifest()
+
+    def object_path(self, digest, ext):
+        return os.path.join(self.objects, digest[:2], digest + ext)
+
+    def add(self, path, video_id=None):
+        """
+        Indexes a finished file and folds it into the store. Returns
+        (digest, earlier entry with the same content or None, the
+        OSError that kept this file from being linked or None).
+        """
+        path = os.path.abspath(path)
+        digest = file_digest(path)
+        size = os.path.getsize(path)
+
+        link_error = None
+
+        with self.lock:
+            duplicate = next((p for p in self._paths(digest) if p != path), None)
+
+            if self.links:
+                try:
+                    self._link(path, self.object_path(digest, os.path.splitext(path)[1]))
+                except OSError as e:
+                    if e.errno in NO_LINK_ERRNOS or getattr(e, "winerror", None) in NO_LINK_WINERRORS:
+                        self.links = False
+                    else:
+                        link_error = e   # this file stays separate, the next one may link
+
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries (path, digest, size, video_id, added) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (path, digest, size, video_id, time.time()),
+            )
+            self.db.commit()
+
+            with open(self.manifest_path, "a", encoding="utf-8") as f:
+                f.write(self._manifest_line(digest, size, path))
+
+        return digest, duplicate, link_error
+
+    def _link(self, path, obj):
+        os.makedirs(os.path.dirname(obj), exist_ok=True)
+
+        if not os.path.exists(obj):
+            os.link(path, obj)   # first copy becomes the object
+        elif not os.path.samefile(path, obj):
+            tmp = path + ".link"
+            os.link(obj, tmp)
+            os.replace(tmp, path)   # same bytes: the title now shares the object's
+
+    def _paths(self, digest):
+        rows = self.db.execute("SELECT path FROM entries WHERE digest = ? ORDER BY added", (digest,))
+        return [row["path"] for row in rows if os.path.exists(row["path"])]
+
+    def lookup(self, digest):
+        """
+        Titles in this folder whose content has this hash.
+        """
+        with self.lock:
+            return self._paths(digest)
+
+    def have(self, path):
+        """
+        Stored titles with the same content as the file at `path`.
+        """
+        path = os.path.abspath(path)
+        return [p for p in self.lookup(file_digest(path)) if p != path]
+
+    def stats(self):
+        with self.lock:
+            rows = self.db.execute("SELECT digest, size FROM entries").fetchall()
+
+        unique = {row["digest"]: row["size"] for row in rows}
+        logical = sum(row["size"] for row in rows)
+        physical = sum(unique.values()) if self.links else logical
+        return {
+            "entries": len(rows),
+            "unique": len(unique),
+            "bytes": logical,
+            "stored_bytes": physical,
+            "saved_bytes": logical - physical,
+        }
+
+    def prune(self):
+        """
+        Forgets titles that were deleted and drops objects no title
+        links to any more. Returns the number of objects removed.
+        """
+        removed = 0
+
+        with self.lock:
+            for row in self.db.execute("SELECT path FROM entries").fetchall():
+                if not os.path.exists(row["path"]):
+                    self.db.execute("DELETE FROM entries WHERE path = ?", (row["path"],))
+            self.db.commit()
+
+            for dirpath, _, files in os.walk(self.objects):
+                for name in files:
+                    obj = os.path.join(dirpath, name)
+                    if os.stat(obj).st_nlink == 1:
+                        os.remove(obj)
+                        removed += 1
+
+            self._write_manifest()
+
+        return removed
+
+    def _write_manifest(self):
+        rows = self.db.execute("SELECT digest, size, path FROM entries ORDER BY path")
+
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(self._manifest_line(row["digest"], row["size"], row["path"]))
+        os.replace(tmp, self.manifest_path)
+
+    def _manifest_line(self, digest, size, path):
+        return f"{digest}\t{size}\t{os.path.relpath(path, self.folder)}\n"
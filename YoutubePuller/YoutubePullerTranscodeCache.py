@@ -0,0 +1,177 @@
+﻿import os
+import time
+import shutil
+import sqlite3
+import hashlib
+import threading
+
+# ================================================================
+#  TRANSCODE CACHE DEFAULTS
+# ================================================================
+# Disk the cached results may take in total, in MB (0 = cache off)
+DEFAULT_TRANSCODE_CACHE_MB = 2048
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key       TEXT PRIMARY KEY,
+    ext       TEXT NOT NULL,
+    size      INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_last_used ON results(last_used);
+CREATE TABLE IF NOT EXISTS sources (
+    origin TEXT PRIMARY KEY,
+    digest TEXT NOT NULL
+);
+"""
+
+
+def cache_key(source_digest, ext, ffmpeg_args):
+    """
+    Identifies one result: the source's content hash plus everything
+    that shapes the output (container, codec, bitrate, filters).
+    """
+    text = "\0".join([source_digest, ext] + list(ffmpeg_args))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def source_origin(info):
+    """
+    Where a source came from (extractor, video, format, size), as far
+    as yt-dlp's info tells. Lets a retry find cached results by the
+    source's hash before downloading it again.
+    """
+    if not info.get("id") or not info.get("format_id"):
+        return None
+    return ":".join(str(info.get(k) or "") for k in ("extractor_key", "id", "format_id", "filesize"))
+
+
+def _copy(src, dest):
+    tmp = f"{dest}.{threading.get_ident()}.tmp"   # two jobs may copy to one place
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, dest)
+
+
+# ================================================================
+#  TRANSCODE CACHE (LRU, SIZE-BOUNDED)
+# ================================================================
+class TranscodeCache:
+    """
+    Keeps copies of finished ffmpeg outputs so the same source made
+    into the same format again (a retry, a re-download after the file
+    was moved) costs a file copy instead of an encode.
+
+    Results are evicted least recently used first once they take more
+    than `max_bytes`; a limit of 0 turns the cache off.
+    """
+
+    def __init__(self, folder, max_bytes):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        os.makedirs(folder, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(folder, "index.sqlite3"), check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+
+        with self.lock:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.executescript(SCHEMA)
+            self.db.commit()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def set_limit(self, max_bytes):
+        with self.lock:
+            self.max_bytes = max(0, max_bytes)
+            self._evict()
+
+    def _path(self, key, ext):
+        return os.path.join(self.folder, key[:2], key + ext)
+
+    def has(self, key):
+        with self.lock:
+            row = self.db.execute("SELECT ext FROM results WHERE key = ?", (key,)).fetchone()
+            return row is not None and os.path.exists(self._path(key, row["ext"]))
+
+    def get(self, key, dest):
+        """
+        Copies the cached result to `dest`. False if it isn't cached.
+        """
+        with self.lock:
+            row = self.db.execute("SELECT ext FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return False
+
+            path = self._path(key, row["ext"])
+            if not os.path.exists(path):
+                self.db.execute("DELETE FROM results WHERE key = ?", (key,))
+                self.db.commit()
+                return False
+
+            self.db.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.db.commit()
+
+            # Under the lock: eviction must not delete it mid-copy (Windows can't)
+            _copy(path, dest)
+            return True
+
+    def put(self, key, src):
+        """
+        Stores a copy of the freshly made `src` under `key`.
+        """
+        size = os.path.getsize(src)
+        if not self.enabled or size > self.max_bytes:
+            return
+
+        ext = os.path.splitext(src)[1]
+        path = self._path(key, ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _copy(src, path)
+
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO results (key, ext, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, ext, size, time.time()),
+            )
+            self._evict()
+            self.db.commit()
+
+    def _evict(self):
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for row in self.db.execute("SELECT key, ext, size FROM results ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(row["key"], row["ext"]))
+            except FileNotFoundError:
+                pass
+            self.db.execute("DELETE FROM results WHERE key = ?", (row["key"],))
+            total -= row["size"]
+
+        self.db.commit()
+
+    def source_digest(self, origin):
+        if not origin:
+            return None
+        with self.lock:
+            row = self.db.execute("SELECT digest FROM sources WHERE origin = ?", (origin,)).fetchone()
+            return row["digest"] if row else None
+
+    def remember_source(self, origin, digest):
+        if not origin:
+            return
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO sources (origin, digest) VALUES (?, ?)", (origin, digest))
+            self.db.commit()
+
+    def stats(self):
+        with self.lock:
+            count, size = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        return {"results": count, "bytes": size, "max_bytes": self.max_bytes}
@@ -0,0 +1,356 @@
+﻿import os
+import sys
+import time
+import struct
+import ctypes
+import ctypes.util
+import threading
+
+from YoutubePullerEngine import (
+    Job, gui_print, is_inside, is_video_file, normalize_and_validate_input, outputs_current,
+)
+from YoutubePullerFormats import scan_plan
+
+# ================================================================
+#  WATCH DEFAULTS
+# ================================================================
+# A dropped file is taken once it had no events and kept its size and
+# mtime for this long (copies over SMB / USB pause between chunks)
+DEFAULT_SETTLE_SECONDS = 2.0
+
+# inotify: a file created but never closed after writing (a hardlink,
+# a crashed writer) is taken anyway after this long unchanged
+OPEN_FILE_TIMEOUT = 60.0
+
+# URL lists are moved here once queued, so they run once
+PROCESSED_DIR_NAME = ".processed"
+
+LIST_EXTENSIONS = (".txt",)
+
+# inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_hidden(path, folder):
+    return any(part.startswith(".") for part in os.path.relpath(path, folder).split(os.sep))
+
+
+def iter_drops(folder, skip=None):
+    """
+    Every video file and URL list in the tree, hidden folders and the
+    `skip` folder (an output tree inside the drop folder) skipped.
+    """
+    for dirpath, dirnames, filenames in os.walk(folder):
+        dirnames[:] = [
+            name for name in dirnames
+            if not name.startswith(".") and os.path.join(dirpath, name) != skip
+        ]
+        for name in filenames:
+            if is_video_file(name) or name.lower().endswith(LIST_EXTENSIONS):
+                yield os.path.join(dirpath, name)
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+# ================================================================
+#  NOTIFICATION BACKENDS
+# ================================================================
+class InotifyBackend:
+    """
+    Linux inotify through libc, no extra package. Every non-hidden
+    folder of the tree gets a watch; folders that appear later get
+    theirs as they are created or moved in.
+    """
+
+    name = "inotify"
+    reports_close = True
+    mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+    def __init__(self, folder, drop):
+        self.drop = drop
+        self.dirs = {}   # watch descriptor → folder
+
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.add_tree(folder)
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def add_tree(self, folder):
+        for dirpath, dirnames, _ in os.walk(folder):
+            dirnames[:] = [
+                name for name in dirnames
+                if not name.startswith(".") and os.path.join(dirpath, name) != self.drop.output_root
+            ]
+
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(dirpath), self.mask)
+            if wd < 0:
+                # Usually fs.inotify.max_user_watches on a huge tree
+                gui_print(f"⚠ Can't watch {dirpath}: {os.strerror(ctypes.get_errno())}")
+                continue
+            self.dirs[wd] = dirpath
+
+    def _run(self):
+        while True:
+            data = os.read(self.fd, 65536)
+            offset = 0
+
+            while offset < len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                start = offset + _EVENT_HEADER.size
+                name = data[start:start + length].rstrip(b"\0")
+                offset = start + length
+
+                if mask & IN_Q_OVERFLOW:
+                    self.drop.scan()   # events were lost: look at everything again
+                    continue
+                if mask & IN_IGNORED:
+                    self.dirs.pop(wd, None)
+                    continue
+
+                folder = self.dirs.get(wd)
+                if folder is None or not name:
+                    continue
+
+                path = os.path.join(folder, os.fsdecode(name))
+                if mask & IN_ISDIR:
+                    if not name.startswith(b"."):
+                        self.add_tree(path)
+                        self.drop.scan(path)   # files that landed before the watch did
+                else:
+                    self.drop.notice(path, closed=not mask & IN_CREATE)
+
+
+class WatchdogBackend:
+    """
+    Windows / macOS: ReadDirectoryChangesW / FSEvents through the
+    watchdog package. No close events there, so files are only judged
+    by size and mtime settling.
+    """
+
+    name = "watchdog"
+    reports_close = False
+
+    def __init__(self, folder, drop):
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.event_type not in ("created", "modified", "moved", "closed"):
+                    return
+
+                path = getattr(event, "dest_path", "") or event.src_path
+                if not event.is_directory:
+                    drop.notice(path)
+                elif event.event_type in ("created", "moved"):
+                    drop.scan(path)
+
+        self.observer = Observer()
+        self.observer.schedule(Handler(), folder, recursive=True)
+        self.observer.daemon = True
+
+    def start(self):
+        self.observer.start()
+
+
+def make_backend(folder, drop):
+    if sys.platform.startswith("linux"):
+        return InotifyBackend(folder, drop)
+
+    try:
+        return WatchdogBackend(folder, drop)
+    except ImportError:
+        raise RuntimeError("Watching a folder needs the watchdog package here (pip install watchdog)")
+
+
+# ================================================================
+#  DROP FOLDER
+# ================================================================
+class DropFolder:
+    """
+    Queues whatever lands in `folder`: video files become local jobs
+    (outputs mirror the tree under the output folder), .txt files are
+    URL lists queued like CLI input and then moved to .processed/.
+
+    Change notifications only mark files as pending; a file is taken
+    once it stopped changing for `settle` seconds (and, with inotify,
+    was closed after writing). Jobs go in no faster than the extract
+    pool takes them (JobQueue.wait_for_room), and the encoder slots cap
+    the ffmpeg processes, however many files arrive at once.
+    """
+
+    def __init__(self, folder, job_queue, job_options, settle=DEFAULT_SETTLE_SECONDS):
+        self.folder = os.path.abspath(folder)
+        self.job_queue = job_queue
+        self.job_options = dict(job_options)
+        self.output_root = os.path.abspath(self.job_options.pop("output_folder"))
+        # Outputs landing in the drop folder would be queued again (.webm,
+        # "keep codec"); an output tree inside it is left alone instead
+        if self.output_root == self.folder:
+            raise RuntimeError("The output folder can't be the drop folder itself")
+        self.plan = scan_plan(self.job_options["output_format"], self.job_options.get("extra_outputs", ()))
+        self.settle = settle
+
+        self.cond = threading.Condition()
+        self.pending = {}   # path → {"seen", "stat", "closed"}
+        self.backend = None
+
+    def start(self):
+        os.makedirs(self.folder, exist_ok=True)
+        self.backend = make_backend(self.folder, self)
+        self.backend.start()
+        threading.Thread(target=self._dispatch, daemon=True).start()
+
+        gui_print(f"👀 Watching drop folder ({self.backend.name}): {self.folder}")
+        self.scan()   # whatever was dropped while nothing watched
+        return self
+
+    def scan(self, folder=None):
+        for path in iter_drops(folder or self.folder, skip=self.output_root):
+            self.notice(path)
+
+    def notice(self, path, closed=True):
+        """
+        Called for every change event: (re)starts the file's settle time.
+        """
+        name = os.path.basename(path)
+        if not (is_video_file(name) or name.lower().endswith(LIST_EXTENSIONS)):
+            return
+        if is_hidden(path, self.folder) or is_inside(path, self.output_root):
+            return
+
+        with self.cond:
+            self.pending[path] = {
+                "seen": time.monotonic(),
+                "stat": _stat(path),
+                "closed": closed or not self.backend.reports_close,
+            }
+            self.cond.notify()
+
+    def _due(self, entry):
+        wait = self.settle if entry["closed"] else OPEN_FILE_TIMEOUT
+        return entry["seen"] + wait
+
+    def _take_ready(self):
+        """
+        Blocks until at least one pending file has settled; returns them.
+        """
+        with self.cond:
+            while True:
+                now = time.monotonic()
+                ready, next_due = [], None
+
+                for path, entry in list(self.pending.items()):
+                    due = self._due(entry)
+
+                    if due <= now:
+                        stat = _stat(path)
+                        if stat is None:
+                            del self.pending[path]   # deleted or moved away again
+                            continue
+                        if stat == entry["stat"]:
+                            del self.pending[path]
+                            ready.append(path)
+                            continue
+
+                        # Still growing without events (network copies): look again later
+                        entry.update(seen=now, stat=stat)
+                        due = self._due(entry)
+
+                    next_due = due if next_due is None else min(next_due, due)
+
+                if ready:
+                    return ready
+                self.cond.wait(None if next_due is None else next_due - now)
+
+    def _dispatch(self):
+        while True:
+            up_to_date = 0
+
+            for path in self._take_ready():
+                try:
+                    if path.lower().endswith(LIST_EXTENSIONS):
+                        self._queue_list(path)
+                    elif not self._queue_file(path):
+                        up_to_date += 1
+                except Exception as e:
+                    gui_print(f"❌ Drop folder: {path}: {e}")
+
+            if up_to_date:
+                self.job_queue.count_up_to_date(up_to_date)
+                gui_print(f"⏭ {up_to_date} dropped file(s) already up to date")
+
+    def _queue_file(self, path):
+        """
+        Queues a dropped video; False if its outputs are already up to date.
+        """
+        relative = os.path.relpath(os.path.dirname(path), self.folder)
+        output_folder = os.path.normpath(os.path.join(self.output_root, relative))
+
+        # Like folder scans: files with nothing to do never become jobs
+        if self.job_options.get("skip_existing", True) and outputs_current(path, output_folder, self.plan):
+            return False
+
+        self.job_queue.wait_for_room()
+        job = self.job_queue.submit(Job(path, output_folder=output_folder, **self.job_options))
+        gui_print(f"📥 Dropped file → job #{job.id}: {path}")
+        return True
+
+    def _queue_list(self, path):
+        with open(path, encoding="utf-8-sig") as f:
+            entries = [
+                entry for line in f
+                if line.strip() and not line.strip().startswith("#")
+                for entry in line.split()
+            ]
+
+        queued = 0
+        for raw_input in entries:
+            url_or_file, input_type = normalize_and_validate_input(raw_input)
+
+            if not url_or_file:
+                gui_print(f"❌ Invalid input in {os.path.basename(path)}: {raw_input}")
+            elif input_type == "playlist":
+                self.job_queue.submit_playlist(url_or_file, output_folder=self.output_root, **self.job_options)
+            elif input_type == "folder":
+                self.job_queue.submit_folder(url_or_file, output_folder=self.output_root, **self.job_options)
+            else:
+                self.job_queue.wait_for_room()
+                self.job_queue.submit(Job(url_or_file, output_folder=self.output_root, **self.job_options))
+            queued += bool(url_or_file)
+
+        processed = os.path.join(self.folder, PROCESSED_DIR_NAME)
+        os.makedirs(processed, exist_ok=True)
+        target = os.path.join(processed, os.path.basename(path))
+        if os.path.exists(target):
+            stem, ext = os.path.splitext(target)
+            target = f"{stem}.{time.strftime('%Y%m%d-%H%M%S')}{ext}"
+        os.replace(path, target)
+
+        gui_print(f"📥 Dropped list {os.path.basename(path)}: {queued} entries queued")
+
+
+def watch_drop_folder(folder, job_queue, job_options, settle=DEFAULT_SETTLE_SECONDS):
+    """
+    Starts watching `folder` and returns the DropFolder.
+    """
+    return DropFolder(folder, job_queue, job_options, settle).start()
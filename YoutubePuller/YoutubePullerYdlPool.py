@@ -0,0 +1,125 @@
+﻿import threading
+
+import yt_dlp
+
+# ================================================================
+#  BASE OPTIONS (shared by every pooled instance)
+# ================================================================
+BASE_YDL_OPTS = {
+    "format": "bestaudio/best",
+    "noplaylist": True,
+    "verbose": True,
+    "quiet": False,
+    "noprogress": True,   # per-chunk progress comes from the progress aggregator
+}
+
+# Extractors tried before yt-dlp's own, see register_extractor()
+_extra_extractors = []
+
+
+def register_extractor(ie):
+    """
+    Adds an InfoExtractor class that every pooled instance created from
+    now on tries first, ahead of yt-dlp's catch-all generic extractor
+    (used by the offline benchmark's stand-in site).
+    """
+    _extra_extractors.append(ie)
+
+
+# ================================================================
+#  POOLED YOUTUBEDL
+# ================================================================
+class PooledYoutubeDL:
+    """
+    A long-lived YoutubeDL owned by one worker thread.
+
+    Keeping the instance alive across jobs keeps its HTTP keep-alive
+    connections, cookie jar and warmed extractors (e.g. the YouTube
+    player cache). Per-job settings are swapped in by configure()
+    instead of building a new instance; the logger and progress hook
+    registered with yt-dlp just forward to the current job's ones.
+    """
+
+    def __init__(self, base_opts=None):
+        self.logger = None
+        self.progress_hook = None
+        self.selectors = {}
+
+        opts = dict(base_opts or BASE_YDL_OPTS)
+        opts["logger"] = self
+        opts["progress_hooks"] = [self._forward_progress]
+
+        if _extra_extractors:
+            # Ours first, then the defaults (skips the verbose header)
+            self.ydl = yt_dlp.YoutubeDL(opts, auto_init=False)
+            for ie in _extra_extractors:
+                self.ydl.add_info_extractor(ie())   # instances: yt-dlp can't look ours up by key
+            self.ydl.add_default_info_extractors()
+        else:
+            self.ydl = yt_dlp.YoutubeDL(opts)
+        self.selectors[opts.get("format")] = self.ydl.format_selector
+
+    def configure(self, ydl_format, outtmpl, ffmpeg_location, logger, progress_hook):
+        params = self.ydl.params
+
+        if ydl_format not in self.selectors:
+            self.selectors[ydl_format] = self.ydl.build_format_selector(ydl_format)
+        self.ydl.format_selector = self.selectors[ydl_format]
+        params["format"] = ydl_format
+
+        params["outtmpl"]["default"] = outtmpl
+        params["ffmpeg_location"] = ffmpeg_location
+
+        self.logger = logger
+        self.progress_hook = progress_hook
+        return self.ydl
+
+    def close(self):
+        self.ydl.close()
+
+    # --- yt-dlp logger protocol, forwarded to the current job ---
+    def debug(self, msg):
+        if self.logger:
+            self.logger.debug(msg)
+
+    def info(self, msg):
+        if self.logger:
+            self.logger.info(msg)
+
+    def warning(self, msg):
+        if self.logger:
+            self.logger.warning(msg)
+
+    def error(self, msg):
+        if self.logger:
+            self.logger.error(msg)
+
+    def _forward_progress(self, d):
+        if self.progress_hook:
+            self.progress_hook(d)
+
+
+# ================================================================
+#  ONE INSTANCE PER WORKER THREAD
+# ================================================================
+_local = threading.local()
+
+
+def get_pooled_ydl():
+    """
+    Returns the calling thread's YoutubeDL, creating it on first use.
+    """
+    pooled = getattr(_local, "pooled", None)
+    if pooled is None:
+        pooled = _local.pooled = PooledYoutubeDL()
+    return pooled
+
+
+def release_pooled_ydl():
+    """
+    Closes the calling thread's YoutubeDL (worker shutting down).
+    """
+    pooled = getattr(_local, "pooled", None)
+    if pooled is not None:
+        pooled.close()
+        _local.pooled = None
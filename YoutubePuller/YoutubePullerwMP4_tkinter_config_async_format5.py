@@ -1,270 +1,239 @@
 ﻿import os
-import re
-import subprocess
-import threading
-import tempfile
-from queue import Queue
+import sys
+import configparser
 
-import yt_dlp
 import tkinter as tk
-from tkinter import scrolledtext, filedialog, Toplevel
-
-# ================================================================
-#  GLOBAL CONFIG DEFAULTS
-# ================================================================
-FFMPEG_PATH = r"d:\ffmpeg\bin\ffmpeg.exe"
-OUTPUT_FOLDER = r"d:\temp\youtubeaudiooutput"
-APP_OS = "windows"  # NEW GLOBAL FLAG
-
-os.makedirs(OUTPUT_FOLDER, exist_ok=True)
-
-default_url = "https://www.youtube.com/watch?v=qmlYf5d-Cvo"
-
-log_queue = Queue()
-RUNNING = False
-
+from tkinter import filedialog, Toplevel
+
+from YoutubePullerConsole import LEVELS, LogRing, VirtualConsole
+from YoutubePullerEvents import FolderScanned, JobDone, JobStarted, LogLine, PlaylistDone
+from YoutubePullerEngine import (
+    APP_DATA_DIR,
+    DEFAULT_CONNECTIONS,
+    DEFAULT_ENCODERS,
+    DEFAULT_OUTPUT_STORE,
+    DEFAULT_RATE_LIMIT_KBPS,
+    DEFAULT_EXTRACT_WORKERS,
+    DEFAULT_PROGRESS_INTERVAL,
+    DEFAULT_TRANSCODE_CACHE_MB,
+    DEFAULT_TRANSCODE_WORKERS,
+    DEFAULT_WORKERS,
+    Job,
+    JobQueue,
+    events,
+    export_metrics,
+    gui_print,
+    format_progress,
+    normalize_and_validate_input,
+    progress,
+    set_encoders,
+    set_output_store,
+    set_progress_interval,
+    set_rate_limit,
+    set_transcode_cache,
+)
+from YoutubePullerApi import serve_api
+from YoutubePullerFormats import parse_output
+from YoutubePullerWatch import watch_drop_folder
 
 # ================================================================
-#  LOGGING INTO GUI
+#  SETTINGS.INI
 # ================================================================
-def gui_print(msg: str):
-    if msg:
-        log_queue.put(str(msg))
-
-
-def process_log_queue():
-    global RUNNING
-    while not log_queue.empty():
-        msg = log_queue.get_nowait()
-
-        if msg == "__DONE__":
-            RUNNING = False
-            ok_button.config(state="normal")
-            continue
+INI_PATH = "settings.ini"
 
-        console.configure(state="normal")
-        console.insert(tk.END, msg.rstrip() + "\n")
-        console.see(tk.END)
-        console.configure(state="disabled")
+# If packaged, store ini next to EXE
+if getattr(sys, "frozen", False):
+    INI_PATH = os.path.join(os.path.dirname(sys.executable), "settings.ini")
 
-    root.after(50, process_log_queue)
 
+def read_settings():
+    config = configparser.ConfigParser()
+    config.read(INI_PATH)
+    return config
 
-# ================================================================
-#  YT-DLP LOGGER + PROGRESS HOOK
-# ================================================================
-class GuiLogger:
-    def debug(self, msg):
-        gui_print(msg)
-
-    def info(self, msg):
-        gui_print(msg)
 
-    def warning(self, msg):
-        gui_print("WARNING: " + msg)
+def settings_mtime():
+    try:
+        return os.path.getmtime(INI_PATH)
+    except OSError:
+        return None
+
+
+config = read_settings()
+
+FFMPEG_PATH = config.get("config", "ffmpeg_path", fallback=r"d:\ffmpeg\bin\ffmpeg.exe")
+OUTPUT_FOLDER = config.get("config", "output_folder", fallback=r"d:\temp\youtubeaudiooutput")
+APP_OS = config.get("config", "os", fallback="windows")
+MAX_WORKERS = config.getint("config", "workers", fallback=DEFAULT_WORKERS)
+EXTRACT_WORKERS = config.getint("config", "extract_workers", fallback=DEFAULT_EXTRACT_WORKERS)
+TRANSCODE_WORKERS = config.getint("config", "transcode_workers", fallback=DEFAULT_TRANSCODE_WORKERS)
+ENCODERS = config.getint("config", "encoders", fallback=DEFAULT_ENCODERS)
+OUTPUT_STORE = config.getboolean("config", "output_store", fallback=DEFAULT_OUTPUT_STORE)
+TRANSCODE_CACHE_MB = config.getint("config", "transcode_cache_mb", fallback=DEFAULT_TRANSCODE_CACHE_MB)
+CONNECTIONS = config.getint("config", "connections", fallback=DEFAULT_CONNECTIONS)
+RATE_LIMIT_KBPS = config.getint("config", "rate_limit_kbps", fallback=DEFAULT_RATE_LIMIT_KBPS)
+API_PORT = config.getint("config", "api_port", fallback=0)
+PROGRESS_INTERVAL = config.getfloat("config", "progress_interval", fallback=DEFAULT_PROGRESS_INTERVAL)
+CONSOLE_LEVEL = config.get("config", "console_level", fallback="info")
+WATCH_FOLDER = config.get("config", "watch_folder", fallback="")
+if CONSOLE_LEVEL not in LEVELS:
+    CONSOLE_LEVEL = "info"
+SETTINGS_MTIME = settings_mtime()
+
+set_rate_limit(RATE_LIMIT_KBPS)
+set_encoders(ENCODERS)
+set_output_store(OUTPUT_STORE)
+set_transcode_cache(TRANSCODE_CACHE_MB)
+set_progress_interval(PROGRESS_INTERVAL)
+os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
-    def error(self, msg):
-        gui_print("ERROR: " + msg)
+default_url = "https://www.youtube.com/watch?v=qmlYf5d-Cvo"
 
+# Log lines for the console; job lifecycle events refresh the queue status
+gui_events = events.subscribe(kinds=(LogLine, JobStarted, JobDone, PlaylistDone, FolderScanned))
+job_queue = JobQueue(MAX_WORKERS, EXTRACT_WORKERS, TRANSCODE_WORKERS)
 
-def ytdlp_progress_hook(d):
-    if d["status"] == "downloading":
-        percent = d.get("_percent_str", "").strip()
-        speed = d.get("_speed_str", "").strip()
-        eta = d.get("eta")
-        gui_print(f"[download] {percent} ETA {eta}s {speed}")
-    elif d["status"] == "finished":
-        gui_print("[download] Finished downloading source file")
+# Stage timings → ~/.youtubepuller/metrics.json and metrics.prom
+metrics_exporter = export_metrics()
 
 
 # ================================================================
-#  HELPERS
+#  LOGGING INTO GUI
 # ================================================================
-def run_ffmpeg_streamed(cmd):
-    gui_print("⚙️ Running ffmpeg...")
-
-    p = subprocess.Popen(
-        cmd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        encoding="utf-8",
-        errors="replace",
-    )
-
-    for line in p.stdout:
-        gui_print(line.rstrip())
-
-    p.wait()
-    gui_print("✅ ffmpeg finished.")
-
-
-def summarize_best_format(info):
-    if "requested_formats" in info:
-        fmt = info["requested_formats"][0]
-    else:
-        fmt = info
-
-    abr = fmt.get("abr")
-    asr = fmt.get("asr")
-    acodec = fmt.get("acodec")
-    ext = fmt.get("ext")
-
-    gui_print(
-        f"🔍 Best format detected: {ext} • {acodec} • "
-        f"{f'{abr} kbps' if abr else 'unknown bitrate'} • "
-        f"{f'{asr} Hz' if asr else 'unknown sample rate'}"
+def update_queue_status():
+    c = job_queue.counts()
+    queue_status.config(
+        text=f"Queue: {c['queued']} waiting • {c['running']} running • "
+             f"{c['done']} done • {c['skipped']} skipped • {c['failed']} failed • "
+             f"{c['cancelled']} cancelled"
+             + (f" • {c['up_to_date']} up to date" if c["up_to_date"] else "")
     )
 
 
-# ================================================================
-#  MP3 CONVERSION (TEMP CLEANUP)
-# ================================================================
-def convert_to_mp3(input_temp_file, output_folder):
-    base = os.path.splitext(os.path.basename(input_temp_file))[0]
-    output_mp3 = os.path.join(output_folder, base + ".mp3")
-
-    # cmd = [
-    #     FFMPEG_PATH, "-i", input_temp_file,
-    #     "-vn",
-    #     "-acodec", "libmp3lame",
-    #     "-ab", "192k",
-    #     output_mp3,
-    # ]
-    cmd = [
-        FFMPEG_PATH,
-        "-y",                      # ← THIS IS THE FIX
-        "-i", input_temp_file,
-        "-vn",
-        "-acodec", "libmp3lame",
-        "-ab", "192k",
-        output_mp3,
+def show_progress():
+    """
+    Shows the latest progress snapshot; redrawn once per snapshot
+    interval no matter how fast the downloads report.
+    """
+    downloading = [
+        state for state in progress.latest().values()
+        if state["status"] == "running" and state["step"] == "download"
     ]
 
+    progress_status.config(text="   ".join(
+        f"#{state['id']} {format_progress(state)}" for state in downloading[:3]
+    ) + (f"   +{len(downloading) - 3} more" if len(downloading) > 3 else ""))
 
+    root.after(int(progress.interval * 1000), show_progress)
 
-    gui_print(f"🎵 Converting to MP3 → {output_mp3}")
-    run_ffmpeg_streamed(cmd)
 
-    try:
-        os.remove(input_temp_file)
-        gui_print(f"🗑 Deleted temp file: {input_temp_file}")
-    except Exception as e:
-        gui_print(f"⚠ Could not delete temp file: {e}")
+def process_events():
+    for event in gui_events.drain():
+        if isinstance(event, LogLine):
+            console.append(str(event), event.level)
+        else:
+            update_queue_status()
 
-    gui_print(f"✅ Saved MP3: {output_mp3}")
+    # One repaint per tick, however many lines arrived
+    console.refresh()
+    root.after(50, process_events)
 
 
-# ================================================================
-#  DOWNLOAD LOGIC
-# ================================================================
-def download_youtube_audio(url: str, output_format: str):
-    global FFMPEG_PATH, OUTPUT_FOLDER
-
-    gui_print(f"🎧 Downloading: {url}")
-
-    if output_format == "mp3":
-        temp_dir = tempfile.gettempdir()
-        outtmpl = os.path.join(temp_dir, "%(title)s.%(ext)s")
-        ydl_format = "bestaudio/best"
-    else:
-        outtmpl = os.path.join(OUTPUT_FOLDER, "%(title)s.%(ext)s")
-        ydl_format = "bestaudio[ext=webm]/bestaudio"
-
-    ydl_opts = {
-        "format": ydl_format,
-        "outtmpl": outtmpl,
-        "noplaylist": True,
-        "ffmpeg_location": FFMPEG_PATH,
-        "logger": GuiLogger(),
-        "progress_hooks": [ytdlp_progress_hook],
-        "verbose": True,
-        "quiet": False,
-    }
+def watch_settings_file():
+    """
+    Applies a bandwidth cap or progress interval edited straight into
+    settings.ini while jobs are running.
+    """
+    global SETTINGS_MTIME, RATE_LIMIT_KBPS, PROGRESS_INTERVAL
 
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(url, download=True)
+    mtime = settings_mtime()
+    if mtime != SETTINGS_MTIME:
+        SETTINGS_MTIME = mtime
 
-    summarize_best_format(info)
+        try:
+            settings = read_settings()
+            kbps = settings.getint("config", "rate_limit_kbps", fallback=RATE_LIMIT_KBPS)
+            interval = settings.getfloat("config", "progress_interval", fallback=PROGRESS_INTERVAL)
+        except (ValueError, configparser.Error):
+            kbps, interval = RATE_LIMIT_KBPS, PROGRESS_INTERVAL
 
-    if "requested_downloads" in info:
-        dl_file = info["requested_downloads"][0]["filepath"]
-    else:
-        dl_file = info["filepath"]
+        if kbps != RATE_LIMIT_KBPS:
+            RATE_LIMIT_KBPS = kbps
+            set_rate_limit(RATE_LIMIT_KBPS)
+            gui_print(f"✔ Bandwidth cap from settings.ini: {RATE_LIMIT_KBPS or 'unlimited'} KB/s")
 
-    if output_format == "mp3":
-        convert_to_mp3(dl_file, OUTPUT_FOLDER)
-    else:
-        gui_print(f"🎵 Saved WEBM: {dl_file}")
+        if interval != PROGRESS_INTERVAL:
+            PROGRESS_INTERVAL = interval
+            set_progress_interval(PROGRESS_INTERVAL)
+            gui_print(f"✔ Progress updates every {PROGRESS_INTERVAL:g}s")
 
-    gui_print(f"📁 Final Output Folder: {OUTPUT_FOLDER}")
+    root.after(2000, watch_settings_file)
 
 
 # ================================================================
-#  THREAD WORKER
+#  JOB SUBMISSION
 # ================================================================
-def worker(url_or_file, out_folder, audio_ext):
-    global OUTPUT_FOLDER
+def run_process():
+    # Several URLs may be pasted at once, separated by spaces
+    raw_inputs = input_box.get().split()
 
-    try:
-        OUTPUT_FOLDER = out_folder
-        os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+    if not raw_inputs:
+        gui_print("❌ Invalid input. Enter a YouTube URL, a local video file or a folder.")
+        return
 
-        if url_or_file.lower().startswith(("http://", "https://")):
-            download_youtube_audio(url_or_file, audio_ext)
-        else:
-            gui_print("❌ Only URLs supported.")
-    except Exception as e:
-        gui_print(f"❌ Error: {e}")
-    finally:
-        log_queue.put("__DONE__")
-
-# Helpers
-def normalize_and_validate_input(raw_input: str):
-    s = raw_input.strip()
-
-    # Add https:// if missing but looks like YouTube
-    if s.startswith("www.youtube.com") or s.startswith("youtube.com"):
-        s = "https://" + s
-
-    # YouTube URL validation
-    youtube_regex = re.compile(
-        r"^https?://(www\.)?(youtube\.com/watch\?v=|youtu\.be/)[\w\-]+"
-    )
+    out_folder = output_box.get().strip()
+    format_choice = audio_format_var.get()
 
-    if youtube_regex.match(s):
-        return s, "youtube"
+    extra_outputs = also_box.get().split()
+    try:
+        for spec in extra_outputs:
+            parse_output(spec)
+    except ValueError as e:
+        gui_print(f"❌ Also as: {e}")
+        return
 
-    # Local MP4 validation
-    if os.path.isfile(s) and s.lower().endswith(".mp4"):
-        return s, "mp4"
+    job_options = {
+        "output_folder": out_folder,
+        "output_format": format_choice,
+        "ffmpeg_path": FFMPEG_PATH,
+        "skip_existing": skip_var.get(),
+        "stream": stream_var.get(),
+        "connections": CONNECTIONS,
+        "extra_outputs": extra_outputs,
+        # A lone URL is someone waiting on it → gets bandwidth ahead of batches
+        "interactive": len(raw_inputs) == 1,
+    }
 
-    return None, None
+    queued = 0
+    for raw_input in raw_inputs:
+        url_or_file, input_type = normalize_and_validate_input(raw_input)
 
-def run_process():
-    global RUNNING
-    if RUNNING:
-        return
+        if not url_or_file:
+            gui_print(f"❌ Invalid input: {raw_input}")
+            continue
 
-    RUNNING = True
-    ok_button.config(state="disabled")
+        # watch?v=…&list=… links only expand when the user asks for it
+        if input_type == "youtube" and expand_var.get() and "list=" in url_or_file:
+            input_type = "playlist"
 
-    # url_or_file = input_box.get().strip()
-    raw_input = input_box.get().strip()
-    url_or_file, input_type = normalize_and_validate_input(raw_input)
+        if input_type == "playlist":
+            gui_print(f"📃 Expanding playlist / channel: {url_or_file}")
+            job_queue.submit_playlist(url_or_file, **dict(job_options, interactive=False))
+            queued += 1
+            continue
 
-    if not url_or_file:
-        gui_print("❌ Invalid input. Enter a YouTube URL or a local .mp4 file.")
-        RUNNING = False
-        ok_button.config(state="normal")
-        return
+        if input_type == "folder":
+            gui_print(f"📂 Scanning folder for videos: {url_or_file}")
+            job_queue.submit_folder(url_or_file, **dict(job_options, interactive=False))
+            queued += 1
+            continue
 
-    out_folder = output_box.get().strip()
-    format_choice = audio_format_var.get()
+        job = job_queue.submit(Job(url_or_file, **job_options))
+        gui_print(f"➕ Queued job #{job.id}: {url_or_file}")
+        queued += 1
 
-    threading.Thread(
-        target=worker, args=(url_or_file, out_folder, format_choice), daemon=True
-    ).start()
+    if queued:
+        update_queue_status()
 
 
 # ================================================================
@@ -277,7 +246,7 @@ def open_config_window():
     config_win.title("Configuration")
 
     width = 650
-    height = 320
+    height = 470
     config_win.geometry(
         f"{width}x{height}+"
         f"{root.winfo_screenwidth()//2 - width//2}+"
@@ -330,6 +299,53 @@ def open_config_window():
     btn_out = tk.Button(row2, text="Browse…", command=lambda: browse_output(output_entry))
     btn_out.pack(side="left", padx=4)
 
+    # ---------------------------
+    # Worker pool row
+    # ---------------------------
+    row3 = tk.Frame(config_win)
+    row3.pack(fill="x", padx=10, pady=10)
+
+    tk.Label(row3, text="Parallel jobs:", width=18, anchor="w").pack(side="left")
+
+    workers_var = tk.StringVar(value=str(MAX_WORKERS))
+    tk.Spinbox(row3, from_=1, to=32, width=5, textvariable=workers_var).pack(side="left", padx=4)
+
+    tk.Label(row3, text="Extract:").pack(side="left", padx=(12, 0))
+    extract_var = tk.StringVar(value=str(EXTRACT_WORKERS))
+    tk.Spinbox(row3, from_=1, to=16, width=5, textvariable=extract_var).pack(side="left", padx=4)
+
+    tk.Label(row3, text="Transcode:").pack(side="left", padx=(12, 0))
+    transcode_var = tk.StringVar(value=str(TRANSCODE_WORKERS))
+    tk.Spinbox(row3, from_=1, to=16, width=5, textvariable=transcode_var).pack(side="left", padx=4)
+
+    # ---------------------------
+    # Connections per download row
+    # ---------------------------
+    row4 = tk.Frame(config_win)
+    row4.pack(fill="x", padx=10, pady=10)
+
+    tk.Label(row4, text="Connections / job:", width=18, anchor="w").pack(side="left")
+
+    connections_var = tk.StringVar(value=str(CONNECTIONS))
+    tk.Spinbox(row4, from_=1, to=16, width=5, textvariable=connections_var).pack(side="left", padx=4)
+
+    tk.Label(row4, text="ffmpeg at once:").pack(side="left", padx=(12, 0))
+    encoders_var = tk.StringVar(value=str(ENCODERS))
+    tk.Spinbox(row4, from_=0, to=64, width=5, textvariable=encoders_var).pack(side="left", padx=4)
+    tk.Label(row4, text="0 = one per core").pack(side="left", padx=4)
+
+    # ---------------------------
+    # Bandwidth cap row
+    # ---------------------------
+    row5 = tk.Frame(config_win)
+    row5.pack(fill="x", padx=10, pady=10)
+
+    tk.Label(row5, text="Bandwidth (KB/s):", width=18, anchor="w").pack(side="left")
+
+    rate_var = tk.StringVar(value=str(RATE_LIMIT_KBPS))
+    tk.Entry(row5, width=10, textvariable=rate_var).pack(side="left", padx=4)
+    tk.Label(row5, text="all jobs together, 0 = unlimited").pack(side="left", padx=4)
+
     # ---------------------------
     # OS MODE HANDLER
     # ---------------------------
@@ -355,7 +371,11 @@ def open_config_window():
     # ---------------------------
     tk.Button(
         config_win, text="Save Settings", width=16,
-        command=lambda: save_config(config_win, ffmpeg_entry, output_entry, os_var)
+        command=lambda: save_config(
+            config_win, ffmpeg_entry, output_entry, os_var,
+            workers_var, extract_var, transcode_var, connections_var, rate_var,
+            encoders_var,
+        )
     ).pack(pady=20)
 
 
@@ -373,11 +393,25 @@ def browse_output(entry):
         entry.insert(0, f)
 
 
-def save_config(win, ffmpeg_entry, output_entry, os_var):
-    global FFMPEG_PATH, OUTPUT_FOLDER, APP_OS
+def save_config(win, ffmpeg_entry, output_entry, os_var, workers_var, extract_var,
+                transcode_var, connections_var, rate_var, encoders_var):
+    global FFMPEG_PATH, OUTPUT_FOLDER, APP_OS, MAX_WORKERS, CONNECTIONS
+    global EXTRACT_WORKERS, TRANSCODE_WORKERS, ENCODERS
+    global RATE_LIMIT_KBPS, SETTINGS_MTIME
 
     APP_OS = os_var.get()
 
+    try:
+        workers = int(workers_var.get())
+        extract_workers = int(extract_var.get())
+        transcode_workers = int(transcode_var.get())
+        connections = int(connections_var.get())
+        kbps = int(rate_var.get())
+        encoder_limit = int(encoders_var.get())
+    except ValueError:
+        gui_print("❌ Parallel jobs, connections, ffmpeg count and bandwidth must be numbers.")
+        return
+
     if APP_OS == "windows":
         ffmpeg = ffmpeg_entry.get().strip()
         out = output_entry.get().strip()
@@ -393,9 +427,49 @@ def save_config(win, ffmpeg_entry, output_entry, os_var):
         FFMPEG_PATH = ffmpeg
         OUTPUT_FOLDER = out
 
+    MAX_WORKERS = max(1, workers)
+    job_queue.set_workers(MAX_WORKERS)
+    EXTRACT_WORKERS = max(1, extract_workers)
+    job_queue.set_workers(EXTRACT_WORKERS, "extract")
+    TRANSCODE_WORKERS = max(1, transcode_workers)
+    job_queue.set_workers(TRANSCODE_WORKERS, "transcode")
+    CONNECTIONS = max(1, connections)
+    ENCODERS = max(0, encoder_limit)
+    set_encoders(ENCODERS)
+    RATE_LIMIT_KBPS = max(0, kbps)
+    set_rate_limit(RATE_LIMIT_KBPS)
+
+    cfg = configparser.ConfigParser()
+    cfg["config"] = {
+        "ffmpeg_path": FFMPEG_PATH,
+        "output_folder": OUTPUT_FOLDER,
+        "os": APP_OS,
+        "workers": str(MAX_WORKERS),
+        "extract_workers": str(EXTRACT_WORKERS),
+        "transcode_workers": str(TRANSCODE_WORKERS),
+        "encoders": str(ENCODERS),
+        "output_store": str(int(OUTPUT_STORE)),
+        "transcode_cache_mb": str(TRANSCODE_CACHE_MB),
+        "connections": str(CONNECTIONS),
+        "rate_limit_kbps": str(RATE_LIMIT_KBPS),
+        "api_port": str(API_PORT),
+        "progress_interval": str(PROGRESS_INTERVAL),
+        "console_level": console_level_var.get(),
+        "watch_folder": WATCH_FOLDER,
+    }
+
+    with open(INI_PATH, "w") as f:
+        cfg.write(f)
+    SETTINGS_MTIME = settings_mtime()
+
+    gui_print(f"✔ Saved settings → {INI_PATH}")
     gui_print(f"✔ OS mode: {APP_OS}")
     gui_print(f"✔ FFmpeg: {FFMPEG_PATH}")
     gui_print(f"✔ Output folder: {OUTPUT_FOLDER}")
+    gui_print(f"✔ Parallel jobs: {MAX_WORKERS} (extract {EXTRACT_WORKERS}, transcode {TRANSCODE_WORKERS})")
+    gui_print(f"✔ Connections per job: {CONNECTIONS}")
+    gui_print(f"✔ ffmpeg at once: {ENCODERS or 'one per core'}")
+    gui_print(f"✔ Bandwidth cap: {RATE_LIMIT_KBPS or 'unlimited'} KB/s")
 
     win.destroy()
 
@@ -411,7 +485,7 @@ root.geometry("820x650")
 config_btn = tk.Button(root, text="Config", width=8, command=open_config_window)
 config_btn.place(relx=0.98, rely=0.01, anchor="ne")
 
-tk.Label(root, text="YouTube URL or Local MP4 Path:").pack(anchor="w", padx=10, pady=(10, 0))
+tk.Label(root, text="YouTube URLs / Playlists / Channels (space separated) or Local Video / Folder Path:").pack(anchor="w", padx=10, pady=(10, 0))
 input_box = tk.Entry(root, width=100)
 input_box.insert(0, default_url)
 input_box.pack(padx=10, pady=5)
@@ -428,19 +502,92 @@ tk.Label(format_frame, text="Output Format:").pack(side="left")
 audio_format_var = tk.StringVar(value="mp3")
 tk.Radiobutton(format_frame, text=".mp3", value="mp3", variable=audio_format_var).pack(side="left", padx=10)
 tk.Radiobutton(format_frame, text=".webm", value="webm", variable=audio_format_var).pack(side="left", padx=10)
+tk.Radiobutton(format_frame, text=".opus", value="opus", variable=audio_format_var).pack(side="left", padx=10)
+tk.Radiobutton(format_frame, text=".m4a", value="m4a", variable=audio_format_var).pack(side="left", padx=10)
+tk.Radiobutton(format_frame, text=".ogg", value="ogg", variable=audio_format_var).pack(side="left", padx=10)
+tk.Radiobutton(format_frame, text="keep codec", value="auto", variable=audio_format_var).pack(side="left", padx=10)
+
+# Own row: next to six formats they'd be cut off at the window's width
+options_frame = tk.Frame(root)
+options_frame.pack(anchor="w", padx=10, pady=5)
+
+skip_var = tk.BooleanVar(value=True)
+tk.Checkbutton(
+    options_frame, text="Skip already downloaded", variable=skip_var
+).pack(side="left")
+
+stream_var = tk.BooleanVar(value=True)
+tk.Checkbutton(
+    options_frame, text="Stream into ffmpeg (no temp file)", variable=stream_var
+).pack(side="left", padx=20)
+
+expand_var = tk.BooleanVar(value=False)
+tk.Checkbutton(
+    options_frame, text="Expand playlist in watch links", variable=expand_var
+).pack(side="left", padx=20)
+
+# Extra formats come out of the same download and the same ffmpeg decode
+also_frame = tk.Frame(root)
+also_frame.pack(anchor="w", padx=10)
+tk.Label(also_frame, text="Also as:").pack(side="left")
+also_box = tk.Entry(also_frame, width=30)
+also_box.pack(side="left", padx=10)
+tk.Label(also_frame, text="e.g. opus mp3:320k (format[:bitrate], space separated)").pack(side="left")
 
 # OK button AFTER the console — lower right corner
 ok_button = tk.Button(root, text="OK", width=14, command=run_process)
 ok_button.place(relx=0.98, rely=0.95, anchor="se")
 
 # Console
-tk.Label(root, text="Status Console:").pack(anchor="w", padx=10)
-console = scrolledtext.ScrolledText(
-    root, width=100, height=22, bg="black", fg="lime",
-    insertbackground="white", font=("Consolas", 10)
+console_header = tk.Frame(root)
+console_header.pack(fill="x", padx=10)
+tk.Label(console_header, text="Status Console:").pack(side="left")
+
+# Only the last CONSOLE_LINES lines stay in memory, older ones go to console.log
+console = VirtualConsole(
+    root, width=100, height=20,
+    ring=LogRing(spill_path=os.path.join(APP_DATA_DIR, "console.log"), min_level=CONSOLE_LEVEL),
+    bg="black", fg="lime", insertbackground="white", font=("Consolas", 10),
 )
 console.pack(padx=10, pady=5)
-console.configure(state="disabled")
 
-root.after(50, process_log_queue)
+console_level_var = tk.StringVar(value=CONSOLE_LEVEL)
+tk.OptionMenu(
+    console_header, console_level_var, *LEVELS, command=console.set_level
+).pack(side="right")
+tk.Label(console_header, text="Show from level:").pack(side="right")
+
+queue_status = tk.Label(root, text="Queue: idle", anchor="w")
+queue_status.place(relx=0.02, rely=0.95, anchor="sw")
+progress_status = tk.Label(root, text="", anchor="w")
+progress_status.place(relx=0.02, rely=0.99, anchor="sw")
+
+# Pick up jobs left unfinished by a crash or an early close
+if job_queue.resume_unfinished():
+    update_queue_status()
+
+# Local tools can queue jobs into this window (settings.ini: api_port)
+if API_PORT:
+    serve_api(job_queue, {
+        "output_folder": OUTPUT_FOLDER,
+        "output_format": "mp3",
+        "ffmpeg_path": FFMPEG_PATH,
+        "connections": CONNECTIONS,
+    }, port=API_PORT)
+
+# Video files / URL lists dropped into a folder queue themselves (settings.ini: watch_folder)
+if WATCH_FOLDER:
+    try:
+        watch_drop_folder(WATCH_FOLDER, job_queue, {
+            "output_folder": OUTPUT_FOLDER,
+            "output_format": audio_format_var.get(),
+            "ffmpeg_path": FFMPEG_PATH,
+            "connections": CONNECTIONS,
+        })
+    except (OSError, RuntimeError) as e:
+        gui_print(f"❌ Can't watch {WATCH_FOLDER}: {e}")
+
+root.after(50, process_events)
+root.after(2000, watch_settings_file)
+root.after(1000, show_progress)
 root.mainloop()